@@ -0,0 +1,82 @@
+"""Recall@k and latency of the IVF index against brute-force search.
+
+Run against an existing local store (queries are perturbed copies of stored
+vectors), or against a synthetic clustered corpus. A store without an IVF index
+gets one trained and saved as its ivf.npz first:
+
+  python -m adk.ann_benchmark --store vectors --k 10 --nprobe 1,4,8,16,32
+  python -m adk.ann_benchmark --synthetic 100000 --dim 768 --dtype int8
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from .ann_index import IVFIndex
+from .vector_store import VECTOR_STORE_DTYPE, LocalVectorStore
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    return centers[rng.integers(clusters, size=rows)] + 0.5 * rng.normal(size=(rows, dim)).astype(np.float32)
+
+
+def build_synthetic_store(path: str, rows: int, dim: int, dtype: str, batch: int = 10000) -> LocalVectorStore:
+    store = LocalVectorStore(path, dtype=dtype, index='ivf')
+    vectors = synthetic_corpus(rows, dim)
+    for start in range(0, rows, batch):
+        end = min(start + batch, rows)
+        store.add_embeddings([f"doc-{i}" for i in range(start, end)], vectors[start:end],
+                             [''] * (end - start))
+    return store
+
+
+def benchmark(store: LocalVectorStore, k: int, nprobes, queries: int, seed: int = 1):
+    ivf = store._ivf
+    if ivf is None:
+        print(f"Training IVF index over {len(store)} rows...")
+        ivf = IVFIndex.train(store.vectors_for, len(store))
+        # search_vectors re-reads ivf.npz on every call, so persist the index for it to pick up.
+        ivf.save(store._ivf_path)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(store), size=min(queries, len(store)), replace=False)
+    base = store.vectors_for(np.sort(sample))
+    query_vectors = base + 0.1 * rng.normal(size=base.shape).astype(np.float32) / np.sqrt(base.shape[1])
+
+    started = time.perf_counter()
+    truth = [set(store.search_vectors(q, k, exact=True)[0].tolist()) for q in query_vectors]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(query_vectors)
+    print(f"rows={len(store)} dim={store.meta['dim']} dtype={store.meta['dtype']} "
+          f"nlist={ivf.nlist} k={k} queries={len(query_vectors)}")
+    print(f"{'nprobe':>8} {'recall@k':>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>8} {1.0:>10.4f} {exact_ms:>10.3f} {1.0:>8.1f}")
+    for nprobe in nprobes:
+        started = time.perf_counter()
+        found = [store.search_vectors(q, k, nprobe=nprobe)[0].tolist() for q in query_vectors]
+        ms = (time.perf_counter() - started) * 1000 / len(query_vectors)
+        recall = np.mean([len(truth[i] & set(rows)) / max(len(truth[i]), 1) for i, rows in enumerate(found)])
+        print(f"{nprobe:>8} {recall:>10.4f} {ms:>10.3f} {exact_ms / ms:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="adk.ann_benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--store", help="Path of an existing local vector store")
+    parser.add_argument("--synthetic", type=int, default=50000, help="Rows in the synthetic corpus")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--dtype", default=VECTOR_STORE_DTYPE, choices=["float32", "float16", "int8"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    args = parser.parse_args(argv)
+
+    if args.store:
+        store = LocalVectorStore(args.store, index='ivf')
+    else:
+        store = build_synthetic_store(tempfile.mkdtemp(prefix='ann-benchmark-'), args.synthetic, args.dim, args.dtype)
+    benchmark(store, args.k, [int(n) for n in args.nprobe.split(',')], args.queries)
+
+
+if __name__ == "__main__":
+    main()
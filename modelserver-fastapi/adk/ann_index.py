@@ -0,0 +1,138 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index for LocalVectorStore.
+
+Vectors are partitioned by spherical k-means into `nlist` cells. A query
+scores the centroids, keeps the `nprobe` closest cells and scores only the rows
+assigned to them, so the work per query is roughly nprobe / nlist of an exact
+scan. Raising `nprobe` trades latency for recall; nprobe == nlist is exact.
+
+The index is just the centroids plus one int32 cell id per row, saved together
+as a single .npz file (written to a temporary name and renamed, so readers
+never see a torn index). New rows are assigned to their nearest centroid as
+they are inserted; the store retrains when the corpus has grown enough that the
+original centroids no longer describe it.
+"""
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+# "exact" (default) scans every row; "ivf" probes IVF cells once enough rows exist.
+VECTOR_INDEX = os.environ.get('VECTOR_INDEX', 'exact')
+IVF_NLIST = int(os.environ.get('IVF_NLIST', '0'))  # 0 = about 4 * sqrt(rows)
+IVF_NPROBE = int(os.environ.get('IVF_NPROBE', '8'))
+IVF_MIN_TRAIN_ROWS = int(os.environ.get('IVF_MIN_TRAIN_ROWS', '4096'))
+# Retrain once the store holds this many times the rows the centroids were trained on.
+IVF_RETRAIN_GROWTH = float(os.environ.get('IVF_RETRAIN_GROWTH', '4'))
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def default_nlist(rows: int) -> int:
+    return max(1, min(rows, int(4 * np.sqrt(rows))))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def assign(centroids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by inner product) for each unit-norm row."""
+    cells = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        cells[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return cells
+
+
+def kmeans(sample: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit-norm rows; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        cells = assign(centroids, sample)
+        counts = np.bincount(cells, minlength=nlist)
+        empty = counts == 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(sample[np.argsort(cells, kind='stable')], starts[~empty], axis=0)
+        if empty.any():
+            # Re-seed empty cells with random points so every cell stays in use.
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_rows: int):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.trained_rows = trained_rows
+        self._build_lists()
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def __len__(self) -> int:
+        """Rows covered by the index; rows past this are scanned exactly."""
+        return self.assignments.shape[0]
+
+    def _build_lists(self):
+        self._order = np.argsort(self.assignments, kind='stable').astype(np.int64)
+        self._offsets = np.searchsorted(self.assignments[self._order], np.arange(self.nlist + 1))
+
+    @classmethod
+    def train(cls, read_rows: Callable, rows: int, nlist: int = 0,
+              seed: int = 0) -> "IVFIndex":
+        """Train on a sample of the first `rows` rows and assign all of them.
+
+        `read_rows(rows)` returns unit-norm float32 vectors for a slice or an index array.
+        """
+        nlist = min(nlist or default_nlist(rows), rows)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(rows, size=min(rows, nlist * KMEANS_SAMPLE_PER_LIST), replace=False))
+        sample = read_rows(sample_rows)
+        centroids = kmeans(sample, nlist, seed=seed)
+        assignments = np.concatenate([assign(centroids, read_rows(slice(start, min(start + ASSIGN_BLOCK_ROWS, rows))))
+                                      for start in range(0, rows, ASSIGN_BLOCK_ROWS)])
+        return cls(centroids, assignments, rows)
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign new or rewritten rows; new rows must directly follow the covered range."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cells = assign(self.centroids, vectors)
+        end = int(rows.max()) + 1 if rows.size else 0
+        if end > len(self):
+            grown = np.full(end, -1, dtype=np.int32)
+            grown[:len(self)] = self.assignments
+            self.assignments = grown
+        self.assignments[rows] = cells
+        if (self.assignments < 0).any():
+            raise ValueError("IVF update left rows without a cell; rows must be contiguous")
+        self._build_lists()
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted rows in the `nprobe` cells closest to `query`."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        scores = self.centroids @ query
+        cells = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        rows = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in cells])
+        rows.sort()
+        return rows
+
+    def save(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, centroids=self.centroids, assignments=self.assignments,
+                 trained_rows=np.array(self.trained_rows))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFIndex"]:
+        try:
+            with np.load(path) as data:
+                return cls(data['centroids'], data['assignments'], int(data['trained_rows']))
+        except FileNotFoundError:
+            return None
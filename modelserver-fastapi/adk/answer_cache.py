@@ -0,0 +1,148 @@
+"""Semantic cache of generated answers for near-duplicate questions.
+
+A question is embedded and compared (cosine similarity) against earlier
+questions asked in the same scope; above `threshold` the stored answer and
+sources are returned without retrieval or generation. Scopes should include the
+index version (see `index_version`) so answers are never served across a
+re-ingested vector store, and every entry also expires after `ttl_seconds`.
+
+Environment defaults: ANSWER_CACHE_SIZE (entries per cache, 0 disables),
+ANSWER_CACHE_THRESHOLD and ANSWER_CACHE_TTL_SECONDS.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', '1000'))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', '0.95'))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', '3600'))
+INDEX_VERSION_TTL_SECONDS = 5.0
+
+_index_versions: Dict[str, tuple] = {}
+
+
+def index_version(path: str) -> int:
+    """Version stamp of a persisted index directory: the newest file mtime under it.
+
+    Ingestion (even from another process) changes it. Re-checked at most every
+    few seconds so the directory walk stays off the hot path.
+    """
+    checked = _index_versions.get(path)
+    now = time.monotonic()
+    if checked is not None and now - checked[0] < INDEX_VERSION_TTL_SECONDS:
+        return checked[1]
+    version = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                version = max(version, os.stat(os.path.join(root, name)).st_mtime_ns)
+            except OSError:
+                continue
+    _index_versions[path] = (now, version)
+    return version
+
+
+class CachedAnswer:
+    __slots__ = ('question', 'answer', 'sources', 'scope', 'vector', 'expires', 'latency_ms', 'similarity')
+
+    def __init__(self, question: str, answer, sources: List, scope: Hashable, vector: np.ndarray,
+                 expires: float, latency_ms: float):
+        self.question = question
+        self.answer = answer
+        self.sources = sources
+        self.scope = scope
+        self.vector = vector
+        self.expires = expires
+        self.latency_ms = latency_ms
+        self.similarity = 1.0
+
+    def matched(self, similarity: float) -> "CachedAnswer":
+        """Copy of this entry carrying one lookup's similarity; the stored entry is shared."""
+        copy = CachedAnswer(self.question, self.answer, self.sources, self.scope, self.vector,
+                            self.expires, self.latency_ms)
+        copy.similarity = similarity
+        return copy
+
+
+class SemanticAnswerCache:
+    def __init__(self, embed_query: Callable[[str], List[float]], threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS, max_entries: int = ANSWER_CACHE_SIZE):
+        self._embed_query = embed_query
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: List[CachedAnswer] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self._embed_query(question), dtype=np.float32)
+        except Exception as e:
+            logging.error(f"Answer cache could not embed the question: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        # Zero vectors come from embedding fallbacks and would match everything.
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, question: str, scope: Hashable) -> Optional[CachedAnswer]:
+        """Best stored answer in `scope` whose question is similar enough, else None."""
+        if self.max_entries <= 0:
+            return None
+        started = time.perf_counter()
+        vector = self._embed(question)
+        with self._lock:
+            now = time.monotonic()
+            self._entries = [entry for entry in self._entries if entry.expires > now]
+            candidates = [entry for entry in self._entries
+                          if entry.scope == scope and entry.vector.shape == getattr(vector, 'shape', None)]
+            if vector is None or not candidates:
+                self.misses += 1
+                return None
+            similarities = np.stack([entry.vector for entry in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry = candidates[best]
+            self.hits += 1
+            self.latency_saved_ms += max(entry.latency_ms - (time.perf_counter() - started) * 1000, 0.0)
+        return entry.matched(float(similarities[best]))
+
+    def store(self, question: str, scope: Hashable, answer, sources: List, latency_ms: float):
+        """Remember an answer that took `latency_ms` to produce."""
+        if self.max_entries <= 0:
+            return
+        vector = self._embed(question)
+        if vector is None:
+            return
+        entry = CachedAnswer(question, answer, sources, scope, vector,
+                             time.monotonic() + self.ttl_seconds, latency_ms)
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                del self._entries[:len(self._entries) - self.max_entries]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 3),
+            "avg_latency_saved_ms": round(self.latency_saved_ms / self.hits, 3) if self.hits else 0.0,
+        }
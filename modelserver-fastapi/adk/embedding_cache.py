@@ -0,0 +1,200 @@
+"""Cache for query embeddings keyed by (model, normalized text).
+
+Repeated queries skip the remote embedding call entirely. Vectors are kept as
+float32 arrays in an in-memory LRU bounded by both entry count and bytes and,
+when EMBEDDING_CACHE_PATH is set, in a SQLite file that survives restarts (disk
+hits are promoted back into memory).
+
+Normalization only collapses whitespace and applies Unicode NFC, so two keys
+match only when the embedding service would see the same text. Only query
+embeddings are cached by default; document embeddings (ingestion, vector store
+adds) are opt-in and use a separate namespace, because some providers (e.g.
+Ollama via LangChain) prefix queries and documents with different instructions.
+
+Environment: EMBEDDING_CACHE_SIZE (in-memory entries, default 10000; 0
+disables caching), EMBEDDING_CACHE_MAX_BYTES (in-memory vector bytes, default
+32 MiB), EMBEDDING_CACHE_DOCUMENTS (1 also caches document embeddings) and
+EMBEDDING_CACHE_PATH (SQLite file, unset = memory only).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '10000'))
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('EMBEDDING_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+EMBEDDING_CACHE_DOCUMENTS = os.environ.get('EMBEDDING_CACHE_DOCUMENTS', '0') == '1'
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH')
+
+Vector = List[float]
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(unicodedata.normalize('NFC', text or '').split())
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute('CREATE TABLE IF NOT EXISTS embeddings_f32 ('
+                                 'model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, '
+                                 'PRIMARY KEY (model, text))')
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Embedding cache disk store unavailable at {path}: {e}")
+                self._db = None
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._bytes -= self._entries.popitem(last=False)[1].nbytes
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[Vector]]:
+        """Cached vectors for `texts` in order, with None for every miss."""
+        if self.max_entries <= 0:
+            return [None] * len(texts)
+        found: List[Optional[Vector]] = []
+        with self._lock:
+            for text in texts:
+                key = (model, normalize_text(text))
+                vector = self._entries.get(key)
+                if vector is None and self._db is not None:
+                    row = self._db.execute('SELECT vector FROM embeddings_f32 WHERE model = ? AND text = ?',
+                                           key).fetchone()
+                    if row is not None:
+                        vector = np.frombuffer(row[0], dtype=np.float32)
+                        self.disk_hits += 1
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._remember(key, vector)
+                    vector = vector.tolist()
+                found.append(vector)
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors: List[Vector]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            rows = []
+            for text, vector in zip(texts, vectors):
+                key = (model, normalize_text(text))
+                vector = np.array(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key[0], key[1], vector.tobytes()))
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany('INSERT OR REPLACE INTO embeddings_f32 VALUES (?, ?, ?)', rows)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Embedding cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "path": self.path if self._db is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+class CachedEmbeddings:
+    """Embeddings client that consults the cache before calling the remote model.
+
+    Exposes the LangChain `embed_documents`/`embed_query` interface, so it can be
+    handed to a vector store, and is also callable on a list of texts. Query
+    embeddings are always cached; document embeddings only with
+    `cache_documents`. Misses in one call are de-duplicated and embedded in a
+    single remote request. If the remote call fails and a `fallback` is given,
+    its vectors are returned but never cached.
+    """
+
+    def __init__(self, embed_documents: Callable[[List[str]], List[Vector]], model: str,
+                 embed_query: Optional[Callable[[str], Vector]] = None,
+                 fallback: Optional[Callable[[List[str]], List[Vector]]] = None,
+                 cache: Optional[EmbeddingCache] = None, cache_documents: bool = EMBEDDING_CACHE_DOCUMENTS):
+        self._embed_documents = embed_documents
+        self._embed_query = embed_query
+        self.model = model
+        self.fallback = fallback
+        self.cache = cache or get_cache()
+        self.cache_documents = cache_documents
+
+    def _embed(self, namespace: Optional[str], texts: List[str],
+               remote: Callable[[List[str]], List[Vector]]) -> List[Vector]:
+        """Embed `texts` through the cache under `namespace`; None bypasses the cache."""
+        vectors = self.cache.get_many(namespace, texts) if namespace else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            try:
+                fetched = remote(missing)
+            except Exception as e:
+                if self.fallback is None:
+                    raise
+                logging.error(f"Embedding call for {self.model} failed: {e}")
+                fetched = self.fallback(missing)
+            else:
+                if namespace:
+                    self.cache.put_many(namespace, missing, fetched)
+            by_text = dict(zip(missing, fetched))
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[Vector]:
+        namespace = f"{self.model}:document" if self.cache_documents else None
+        return self._embed(namespace, list(texts), self._embed_documents)
+
+    def embed_query(self, text: str) -> Vector:
+        if self._embed_query is None:
+            return self._embed(f"{self.model}:query", [text], self._embed_documents)[0]
+        return self._embed(f"{self.model}:query", [text], lambda texts: [self._embed_query(texts[0])])[0]
+
+    def __call__(self, texts: List[str]) -> List[Vector]:
+        return self.embed_documents(texts)
@@ -1,4 +1,7 @@
 import os
+import time
+from typing import Iterator
+
 try:
     import google.generativeai as genai
     genai.configure(api_key=os.environ.get('GOOGLE_API_KEY'))
@@ -17,12 +20,66 @@ Answer the question based only on the following context:
 Answer the question based on the above context: {question}
 """
 
+# "gemini" (default) or "local": an offline stand-in that answers extractively
+# from the retrieved context and streams word by word, for tests and demos.
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+LOCAL_LLM_TOKEN_DELAY_MS = float(os.environ.get('LOCAL_LLM_TOKEN_DELAY_MS', '0'))
+
+
+class LocalLLM:
+    """Stand-in LLM with the LangChain `invoke`/`stream` interface.
+
+    Streams the first `max_words` words of the prompt's context, pausing
+    LOCAL_LLM_TOKEN_DELAY_MS between tokens to mimic a real model.
+    """
+
+    def __init__(self, max_words: int = 60, delay_ms: float = LOCAL_LLM_TOKEN_DELAY_MS):
+        self.max_words = max_words
+        self.delay_ms = delay_ms
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        body = prompt.split('context:', 1)[-1]
+        context = body.rsplit('\n---\n', 1)[0] if '\n---\n' in body else body
+        words = [w for w in context.split() if w != '---'][:self.max_words] or ["I", "don't", "know."]
+        for i, word in enumerate(words):
+            if self.delay_ms:
+                time.sleep(self.delay_ms / 1000)
+            yield word if i == 0 else ' ' + word
+
+    def invoke(self, prompt: str) -> str:
+        return ''.join(self.stream(prompt))
+
+
+def generate_response_stream(context_text: str, question: str) -> Iterator[str]:
+    """Like `generate_response` but yields text chunks as the model produces them.
+
+    Unlike `generate_response`, failures raise instead of returning a
+    "(generation-error)" answer.
+    """
+    prompt = PROMPT_TEMPLATE.format(context=context_text or '', question=question or '')
+    if LLM_BACKEND == 'local':
+        yield from LocalLLM().stream(prompt)
+        return
+    if not HAS_GOOGLE:
+        raise RuntimeError('google generative sdk not installed or GOOGLE_API_KEY not set')
+
+    # Errors propagate so the SSE stream ends with an `error` event rather than
+    # sending the message as answer text.
+    model = genai.GenerativeModel('gemini-2.5-flash')
+    for chunk in model.generate_content(prompt, stream=True):
+        text = getattr(chunk, 'text', None)
+        if text:
+            yield text
+
+
 def generate_response(context_text: str, question: str) -> str:
     """Generate a response using Google Gemini 2.5 Flash via the Google Gen SDK.
 
     Falls back with an informative message if the SDK or API key is missing.
     """
     prompt = PROMPT_TEMPLATE.format(context=context_text or '', question=question or '')
+    if LLM_BACKEND == 'local':
+        return LocalLLM().invoke(prompt)
     if not HAS_GOOGLE:
         return '(generation-error) google generative sdk not installed or GOOGLE_API_KEY not set'
 
@@ -0,0 +1,63 @@
+"""Shared, pooled HTTP clients for calls to the Express backend.
+
+Every Express call in `main.py` and `adk/` goes through one of these clients so
+connections are kept alive and reused instead of opened per request.
+
+- `get_async_client()` is for `async def` endpoints and coroutines.
+- `get_sync_client()` is for code that already runs off the event loop
+  (background threads, threadpool endpoints) and must stay synchronous.
+
+Pool limits and the default timeout are read from the environment:
+EXPRESS_POOL_MAX_CONNECTIONS, EXPRESS_POOL_MAX_KEEPALIVE and
+EXPRESS_TIMEOUT_SECONDS. Callers can pass `timeout=` per call to override it.
+"""
+import os
+import threading
+from typing import Optional
+
+import httpx
+
+MAX_CONNECTIONS = int(os.getenv('EXPRESS_POOL_MAX_CONNECTIONS', '100'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('EXPRESS_POOL_MAX_KEEPALIVE', '20'))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv('EXPRESS_TIMEOUT_SECONDS', '10'))
+
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    return {
+        'limits': httpx.Limits(max_connections=MAX_CONNECTIONS,
+                               max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+        'timeout': httpx.Timeout(DEFAULT_TIMEOUT_SECONDS),
+    }
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**_client_options())
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Return the process-wide blocking Client, creating it on first use."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
+
+
+async def close_clients():
+    """Close both pools; call from the application's shutdown hook."""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
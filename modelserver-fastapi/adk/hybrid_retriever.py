@@ -1,7 +1,15 @@
 import os
-import requests
+import threading
+import time
 from typing import List, Dict
 
+from . import mongo_store
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .http_client import get_sync_client
+from .lexical_index import LexicalIndex
+from .resources import registry
+from .vector_store import open_vector_store
+
 # Attempt to use Google's Generative AI SDK for embeddings (fallbacks handled)
 try:
     import google.generativeai as genai
@@ -13,53 +21,63 @@ except Exception:
 
 CHROMA_PATH = 'chroma'
 EXPRESS_URL = 'http://127.0.0.1:3000'
+LEXICAL_TIMEOUT_SECONDS = float(os.environ.get('LEXICAL_TIMEOUT_SECONDS', '10'))
+LEXICAL_INDEX_TTL_SECONDS = float(os.environ.get('LEXICAL_INDEX_TTL_SECONDS', '600'))
+LEXICAL_INDEX_PAGE_SIZE = int(os.environ.get('LEXICAL_INDEX_PAGE_SIZE', '1000'))
+LEXICAL_INDEX_FIELDS = ('_id', 'title', 'genres', 'cast', 'plot', 'imdb')
+
+
+def _zero_vectors(texts: List[str]) -> List[List[float]]:
+    return [[0.0]*768 for _ in texts]
+
+
+def _gecko_embed(texts: List[str]) -> List[List[float]]:
+    # Google Gen AI embeddings API may accept a single string or list
+    resp = genai.embeddings.create(model='embed-gecko-001', input=texts)
+    # resp may contain 'data' with embeddings
+    if isinstance(resp, dict) and 'data' in resp:
+        return [item.get('embedding') for item in resp['data']]
+    # attempt attribute access
+    if hasattr(resp, 'data'):
+        return [getattr(d, 'embedding', None) for d in resp.data]
+    raise ValueError(f'unexpected embedding response: {type(resp).__name__}')
 
 
 def get_embedding_function():
     """Return a callable that accepts a list of texts and returns a list of embeddings.
 
-    Uses Google Generative SDK when available. If not available, returns a dummy
-    embedding function (zero vectors) so callers don't crash.
+    Uses Google Generative SDK when available, through the shared embedding cache
+    so repeated texts skip the remote call. The returned object also has
+    `embed_query`/`embed_documents` for vector stores. If the SDK is not available
+    (or a call fails), zero vectors are returned so callers don't crash.
     """
     if HAS_GOOGLE:
-        def embed_texts(texts: List[str]):
-            try:
-                # Google Gen AI embeddings API may accept a single string or list
-                resp = genai.embeddings.create(model='embed-gecko-001', input=texts)
-                # resp may contain 'data' with embeddings
-                if isinstance(resp, dict) and 'data' in resp:
-                    return [item.get('embedding') for item in resp['data']]
-                # attempt attribute access
-                if hasattr(resp, 'data'):
-                    return [getattr(d, 'embedding', None) for d in resp.data]
-                return [[0.0]*768 for _ in texts]
-            except Exception as e:
-                print('embedding error', e)
-                return [[0.0]*768 for _ in texts]
-
-        return embed_texts
-
-    else:
-        def dummy(texts: List[str]):
-            return [[0.0]*768 for _ in texts]
-
-        return dummy
+        return CachedEmbeddings(_gecko_embed, model='embed-gecko-001', fallback=_zero_vectors)
+    return CachedEmbeddings(_zero_vectors, model='zero', cache=EmbeddingCache(max_entries=0))
+
+
+def _open_vector_store():
+    return open_vector_store(registry.get('adk_embeddings'), CHROMA_PATH)
+
+
+# Built once per process (at startup when the app warms the registry) and reused by every query.
+registry.register('adk_embeddings', get_embedding_function)
+registry.register('adk_vector_store', _open_vector_store, warm=lambda db: db.get(limit=1))
 
 
 def semantic_search(query: str, k: int = 5) -> List[Dict]:
-    """Perform semantic search using Chroma if available (requires chroma and embeddings).
+    """Perform semantic search using the configured vector store (Chroma, or the local
+    memory-mapped store with VECTOR_BACKEND=local) and embeddings.
 
-    If Chroma or Google embeddings are not available, returns an empty list.
+    If the store or Google embeddings are not available, returns an empty list.
     """
     try:
-        from langchain_community.vectorstores import Chroma
-    except Exception:
-        print('Chroma not available for semantic search')
+        db = registry.get('adk_vector_store')
+    except Exception as e:
+        print('Vector store not available for semantic search:', e)
         return []
 
-    embedding_fn = get_embedding_function()
     try:
-        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_fn)
         results = db.similarity_search_with_score(query, k=k)
         return [{'content': doc.page_content, 'score': score, 'metadata': doc.metadata} for doc, score in results]
     except Exception as e:
@@ -67,25 +85,63 @@ def semantic_search(query: str, k: int = 5) -> List[Dict]:
         return []
 
 
+def fetch_lexical_movies() -> List[Dict]:
+    """Every movie with the fields the lexical index needs, from MongoDB when enabled,
+    otherwise paged from Express."""
+    if mongo_store.is_enabled():
+        projection = {'title': 1, 'genres': 1, 'cast': 1, 'plot': 1, 'imdb.rating': 1}
+        return list(mongo_store.iter_movies(projection=projection))
+
+    movies = []
+    page = 1
+    while True:
+        resp = get_sync_client().get(f"{EXPRESS_URL}/movies",
+                                     params={'page': page, 'limit': LEXICAL_INDEX_PAGE_SIZE, 'fields': 'all'},
+                                     timeout=LEXICAL_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        batch = resp.json()
+        movies.extend({field: m[field] for field in LEXICAL_INDEX_FIELDS if field in m} for m in batch)
+        if len(batch) < LEXICAL_INDEX_PAGE_SIZE:
+            return movies
+        page += 1
+
+
+def _build_lexical_index() -> LexicalIndex:
+    index = LexicalIndex()
+    stats = index.sync(fetch_lexical_movies())
+    print('lexical index built:', stats)
+    return index
+
+
+registry.register('lexical_index', _build_lexical_index)
+_lexical_refresh_lock = threading.Lock()
+
+
+def _refresh_lexical_index(index: LexicalIndex):
+    if not _lexical_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        print('lexical index refreshed:', index.sync(fetch_lexical_movies()))
+    except Exception as e:
+        print('lexical index refresh error:', e)
+    finally:
+        _lexical_refresh_lock.release()
+
+
 def lexical_search(query: str, k: int = 10) -> List[Dict]:
-    """A simple lexical retriever that fetches movie documents from Express and performs token match locally."""
+    """BM25 search over the in-memory lexical index of title, plot, cast and genres.
+
+    The index is built once (on first use, or at startup when the app warms the
+    registry) and then synced incrementally in the background every
+    LEXICAL_INDEX_TTL_SECONDS, so queries never wait on a catalog download.
+    Scores are normalized to [0, 1] for the reranker; `bm25` holds the raw score.
+    """
     try:
-        resp = requests.get(f"{EXPRESS_URL}/movies?limit=500")
-        resp.raise_for_status()
-        movies = resp.json()
+        index = registry.get('lexical_index')
     except Exception as e:
-        print('lexical_search error fetching movies:', e)
-        movies = []
-
-    q = query.lower().strip()
-    matches = []
-    tokens = [tok for tok in q.split() if tok]
-    for m in movies:
-        text = ' '.join([
-            str(m.get('title', '')),
-            ' '.join(m.get('genres', [])) if isinstance(m.get('genres', []), list) else str(m.get('genres', '')),
-            ' '.join(m.get('cast', [])) if isinstance(m.get('cast', []), list) else str(m.get('cast', ''))
-        ]).lower()
-        if all(tok in text for tok in tokens):
-            matches.append({'movie': m, 'score': 1.0})
-    return matches[:k]
+        print('lexical_search error building index:', e)
+        return []
+
+    if time.time() - (index.updated_at or 0) > LEXICAL_INDEX_TTL_SECONDS and not _lexical_refresh_lock.locked():
+        threading.Thread(target=_refresh_lexical_index, args=(index,), daemon=True).start()
+    return index.search(query, k)
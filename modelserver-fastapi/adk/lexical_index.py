@@ -0,0 +1,223 @@
+"""In-memory BM25 index over movie title, plot, cast and genres.
+
+Documents are tokenized once into per-term postings (`term -> {doc: weighted
+tf}`), so a query only touches the postings of its own terms and its cost does
+not grow with the catalog. Fields are weighted BM25F-style: a title hit counts
+more than a plot hit. Movies can be added, replaced or removed one at a time, and
+`sync` applies a fresh catalog as the minimal set of such updates.
+
+`search` drops stopwords from the query (unless nothing else is left) and
+runs the threshold algorithm over impact-ordered postings: each term's postings
+are sorted by BM25 contribution and read in blocks from the list with the
+largest next impact, every newly seen document is scored exactly by random
+access into the other terms, and a k-sized heap keeps the best. Reading stops
+once the lists' next impacts together fall below the k-th score. Terms in more
+than COMMON_TERM_DF of the documents are read for at most COMMON_TERM_POSTINGS
+postings once k documents are found; past that they only add to the scores of
+documents found through other terms. Queries without such terms are exact.
+"""
+import hashlib
+import heapq
+import json
+import math
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FIELD_WEIGHTS = {'title': 3.0, 'genres': 1.5, 'cast': 1.5, 'plot': 1.0}
+K1 = 1.2
+B = 0.75
+BLOCK_SIZE = 64
+COMMON_TERM_DF = 0.1
+COMMON_TERM_POSTINGS = 512
+
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in is it its of on or that the this to was were with'.split())
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct query tokens, without stopwords unless the query is nothing but stopwords."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    return [term for term in terms if term not in STOPWORDS] or terms
+
+
+def _field_text(value) -> str:
+    if isinstance(value, list):
+        return ' '.join(str(v) for v in value)
+    return str(value or '')
+
+
+def movie_terms(movie: Dict) -> Dict[str, float]:
+    """Field-weighted term frequencies for one movie."""
+    tf: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(_field_text(movie.get(field))):
+            tf[token] = tf.get(token, 0.0) + weight
+    return tf
+
+
+def _fingerprint(movie: Dict) -> str:
+    return hashlib.sha1(json.dumps([movie.get(f) for f in FIELD_WEIGHTS], default=str).encode()).hexdigest()
+
+
+class LexicalIndex:
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self._docs: Dict[int, Dict] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._fingerprints: Dict[int, str] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_doc = 0
+        self._total_len = 0.0
+        # term -> (docs, saturated tf sorted by impact, doc -> saturated tf); dropped on every update.
+        self._impacts: Dict[str, Tuple[np.ndarray, np.ndarray, Dict[int, float]]] = {}
+        self._lock = threading.Lock()
+        self.updated_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove_doc(self, doc: int):
+        self._impacts.clear()
+        for term in self._doc_terms.pop(doc):
+            posting = self.postings[term]
+            del posting[doc]
+            if not posting:
+                del self.postings[term]
+        self._total_len -= self._doc_len.pop(doc)
+        del self._docs[doc]
+        del self._fingerprints[doc]
+
+    def _upsert(self, movie: Dict) -> bool:
+        movie_id = str(movie.get('_id', ''))
+        fingerprint = _fingerprint(movie)
+        doc = self._ids.get(movie_id)
+        if doc is not None:
+            if self._fingerprints[doc] == fingerprint:
+                self._docs[doc] = movie
+                return False
+            self._remove_doc(doc)
+        self._impacts.clear()
+        doc = self._next_doc
+        self._next_doc += 1
+        terms = movie_terms(movie)
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc] = tf
+        self._docs[doc] = movie
+        self._doc_terms[doc] = terms
+        self._doc_len[doc] = sum(terms.values())
+        self._fingerprints[doc] = fingerprint
+        self._total_len += self._doc_len[doc]
+        self._ids[movie_id] = doc
+        return True
+
+    def upsert(self, movies: Iterable[Dict]) -> int:
+        """Add or replace movies (matched by `_id`); returns how many were (re)indexed."""
+        with self._lock:
+            changed = sum(self._upsert(movie) for movie in movies)
+            self.updated_at = time.time()
+        return changed
+
+    def remove(self, movie_ids: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for movie_id in movie_ids:
+                doc = self._ids.pop(str(movie_id), None)
+                if doc is not None:
+                    self._remove_doc(doc)
+                    removed += 1
+        return removed
+
+    def sync(self, movies: List[Dict]) -> Dict[str, int]:
+        """Make the index match `movies`, touching only new, changed and deleted entries."""
+        keep = {str(movie.get('_id', '')) for movie in movies}
+        changed = self.upsert(movies)
+        removed = self.remove([movie_id for movie_id in list(self._ids) if movie_id not in keep])
+        return {'changed': changed, 'removed': removed, 'documents': len(self)}
+
+    def _term_impacts(self, term: str, avg_len: float) -> Tuple[np.ndarray, np.ndarray, Dict[int, float]]:
+        """Docs containing `term` and their saturated tf weights, highest weight first,
+        plus the same weights keyed by doc for random access."""
+        cached = self._impacts.get(term)
+        if cached is None:
+            posting = self.postings[term]
+            docs = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+            tf = np.fromiter(posting.values(), dtype=np.float64, count=len(posting))
+            doc_len = np.fromiter((self._doc_len[doc] for doc in posting), dtype=np.float64, count=len(posting))
+            weights = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc_len / avg_len))
+            order = np.argsort(-weights, kind='stable')
+            docs, weights = docs[order], weights[order]
+            cached = self._impacts[term] = (docs, weights, dict(zip(docs.tolist(), weights.tolist())))
+        return cached
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        """Top-k movies by BM25. `score` is normalized by the query's maximum
+        attainable score (so it lies in [0, 1]); `bm25` is the raw score."""
+        words = query_terms(query)
+        with self._lock:
+            n = len(self._docs)
+            if not n or k <= 0:
+                return []
+            avg_len = self._total_len / n
+
+            terms = []
+            for term in words:
+                posting = self.postings.get(term)
+                if posting:
+                    df = len(posting)
+                    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                    docs, weights, by_doc = self._term_impacts(term, avg_len)
+                    terms.append((idf, by_doc, docs, weights, df > COMMON_TERM_DF * n))
+            if not terms:
+                return []
+
+            def score(doc: int) -> float:
+                return sum(idf * by_doc.get(doc, 0.0) for idf, by_doc, *_rest in terms)
+
+            # Min-heap of the k best (score, -doc) seen so far, i.e. rooted at the worst of them.
+            top: List[Tuple[float, int]] = []
+            seen = set()
+            read = [0] * len(terms)
+            while True:
+                filled = len(top) == k
+                heads = [idf * weights[read[i]]
+                         if read[i] < len(docs) and not (common and filled and read[i] >= COMMON_TERM_POSTINGS) else 0.0
+                         for i, (idf, _by_doc, docs, weights, common) in enumerate(terms)]
+                if filled and top[0][0] > sum(heads) or not any(heads):
+                    break
+                i = max(range(len(terms)), key=heads.__getitem__)
+                docs = terms[i][2]
+                end = min(read[i] + BLOCK_SIZE, len(docs))
+                for doc in docs[read[i]:end].tolist():
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    entry = (score(doc), -doc)
+                    if len(top) < k:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+                read[i] = end
+
+            max_score = sum(idf * (self.k1 + 1) for idf, *_rest in terms)
+            return [{'movie': self._docs[-doc], 'score': bm25 / max_score, 'bm25': bm25}
+                    for bm25, doc in sorted(top, reverse=True)]
+
+    def stats(self) -> Dict:
+        return {
+            'documents': len(self._docs),
+            'terms': len(self.postings),
+            'updated_at': self.updated_at,
+        }
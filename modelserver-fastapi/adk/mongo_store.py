@@ -0,0 +1,86 @@
+"""Optional direct MongoDB read path for movie documents.
+
+Enabled with MOVIE_SOURCE=mongo and MONGODB_URI (the same URI the Express
+backend uses). Reads project only the fields the recommender and retrievers
+use, stream through a cursor in batches, and return documents shaped like the
+Express JSON (string `_id`), so callers can switch sources transparently.
+
+Every function takes an optional `collection`, so a local mongod collection or
+an in-memory stand-in such as `mongomock` can be injected for testing.
+"""
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pymongo
+    from bson import ObjectId
+    HAS_PYMONGO = True
+except Exception:
+    pymongo = None
+    ObjectId = None
+    HAS_PYMONGO = False
+
+MOVIE_SOURCE = os.environ.get('MOVIE_SOURCE', 'express')
+MONGODB_URI = os.environ.get('MONGODB_URI')
+MONGODB_DB = os.environ.get('MONGODB_DB', 'sample_mflix')
+MONGODB_COLLECTION = os.environ.get('MONGODB_COLLECTION', 'movies')
+MONGODB_BATCH_SIZE = int(os.environ.get('MONGODB_BATCH_SIZE', '1000'))
+
+# Fields read by the recommender, /similar and the lexical retriever.
+MOVIE_PROJECTION = {'title': 1, 'genres': 1, 'cast': 1, 'imdb.rating': 1}
+# The catalog also keeps the display fields /similar returns.
+CATALOG_PROJECTION = dict(MOVIE_PROJECTION, year=1, poster=1)
+
+_client = None
+_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """True when movies should be read from MongoDB instead of Express."""
+    return MOVIE_SOURCE == 'mongo' and HAS_PYMONGO and bool(MONGODB_URI)
+
+
+def get_collection():
+    """Return the movies collection on a shared, lazily created MongoClient."""
+    global _client
+    if not HAS_PYMONGO:
+        raise RuntimeError('pymongo is not installed')
+    with _lock:
+        if _client is None:
+            _client = pymongo.MongoClient(MONGODB_URI)
+    return _client[MONGODB_DB][MONGODB_COLLECTION]
+
+
+def _to_json(doc: Dict) -> Dict:
+    if '_id' in doc:
+        doc['_id'] = str(doc['_id'])
+    return doc
+
+
+def iter_movies(projection: Optional[Dict] = None, limit: int = 0, batch_size: int = MONGODB_BATCH_SIZE,
+                collection=None) -> Iterator[Dict]:
+    """Stream every movie (or the first `limit`) with only the projected fields."""
+    collection = collection if collection is not None else get_collection()
+    cursor = collection.find({}, projection or MOVIE_PROJECTION, batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    try:
+        for doc in cursor:
+            yield _to_json(doc)
+    finally:
+        cursor.close()
+
+
+def find_movies_by_ids(movie_ids: List[str], projection: Optional[Dict] = MOVIE_PROJECTION,
+                       collection=None) -> List[Dict]:
+    """Fetch movies by string ObjectId with a single `$in` query; invalid ids are ignored.
+
+    `projection=None` returns whole documents, like Express with `fields=all`.
+    """
+    object_ids = [ObjectId(i) for i in movie_ids if ObjectId.is_valid(i)]
+    if not object_ids:
+        return []
+    collection = collection if collection is not None else get_collection()
+    cursor = collection.find({'_id': {'$in': object_ids}}, projection)
+    return [_to_json(doc) for doc in cursor]
@@ -1,36 +1,155 @@
-from typing import List, Dict
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 from .intent_router import classify_intent
 from .hybrid_retriever import semantic_search, lexical_search
 from .reranker import rerank_results
 from .memory_rewriter import rewrite_query
-from .generator import generate_response
+from .generator import generate_response, generate_response_stream
 
-def run_multi_agent(query_text: str, chat_history: List[Dict]=None) -> Dict:
-    """Run the multi-agent pipeline and return structured output.
+# Per-stage budgets. A stage that overruns is reported as 'timeout' and the
+# pipeline continues with that stage's empty result.
+SEMANTIC_STAGE_TIMEOUT_SECONDS = float(os.environ.get('SEMANTIC_STAGE_TIMEOUT_SECONDS', '10'))
+LEXICAL_STAGE_TIMEOUT_SECONDS = float(os.environ.get('LEXICAL_STAGE_TIMEOUT_SECONDS', '10'))
+RERANK_STAGE_TIMEOUT_SECONDS = float(os.environ.get('RERANK_STAGE_TIMEOUT_SECONDS', '5'))
+GENERATION_STAGE_TIMEOUT_SECONDS = float(os.environ.get('GENERATION_STAGE_TIMEOUT_SECONDS', '60'))
+# Threads per stage; each stage has its own pool.
+STAGE_WORKERS = int(os.environ.get('ADK_STAGE_WORKERS', '8'))
+
+_stage_executors: Dict[str, ThreadPoolExecutor] = {}
+_stage_executors_lock = threading.Lock()
+
+
+def stage_executor(name: str) -> ThreadPoolExecutor:
+    """Bounded thread pool for one stage. Threads still busy with timed-out calls
+    only hold up later calls of the same stage, not other stages or the event
+    loop's default executor."""
+    with _stage_executors_lock:
+        executor = _stage_executors.get(name)
+        if executor is None:
+            executor = _stage_executors[name] = ThreadPoolExecutor(max_workers=STAGE_WORKERS,
+                                                                   thread_name_prefix=f'adk-{name}')
+    return executor
 
-    Output includes: intent, rewritten_query, semantic_results, lexical_results, reranked, final_response
+
+async def _run_stage(stages: List[Dict], name: str, fn: Callable, *args, timeout: float, default: Any,
+                     executor=None, **kwargs) -> Any:
+    """Run a blocking stage off the event loop under `timeout`, recording its outcome.
+
+    The call runs in `executor` if given, else in the stage's own pool. On timeout
+    or error the stage's `default` is returned instead. Worker threads cannot be
+    interrupted, so a timed-out call finishes in the background and its result is
+    discarded.
     """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    record = {'stage': name, 'status': 'ok'}
+    try:
+        result = await asyncio.wait_for(
+            loop.run_in_executor(executor or stage_executor(name), functools.partial(fn, *args, **kwargs)),
+            timeout)
+    except asyncio.TimeoutError:
+        record['status'] = 'timeout'
+        result = default
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        result = default
+    record['ms'] = round((time.perf_counter() - started) * 1000, 3)
+    stages.append(record)
+    return result
+
+
+async def aretrieve_multi_agent(query_text: str, chat_history: List[Dict]=None, executor=None) -> Dict:
+    """Run every stage before generation; returns the output of `run_multi_agent` without
+    `response`, plus the `context_text` the generator is given.
+
+    Semantic and lexical retrieval run concurrently, so retrieval takes about as
+    long as the slower of the two. A retriever that fails or times out contributes
+    no results and the rest of the pipeline continues; `stages` lists every stage
+    with its status and duration, and `partial` is set when any of them fell short.
+    """
+    stages: List[Dict] = []
     intent = classify_intent(query_text)
     rewritten = rewrite_query(chat_history or [], query_text)
 
     # Retrieval
-    semantic = semantic_search(rewritten, k=5)
-    lexical = lexical_search(rewritten, k=10)
+    semantic, lexical = await asyncio.gather(
+        _run_stage(stages, 'semantic', semantic_search, rewritten, k=5,
+                   timeout=SEMANTIC_STAGE_TIMEOUT_SECONDS, default=[]),
+        _run_stage(stages, 'lexical', lexical_search, rewritten, k=10,
+                   timeout=LEXICAL_STAGE_TIMEOUT_SECONDS, default=[]),
+    )
 
-    # Rerank
-    reranked = rerank_results(semantic, lexical)
+    # Rerank (in `executor`, e.g. a process pool, when given)
+    reranked = await _run_stage(stages, 'rerank', rerank_results, semantic, lexical,
+                                timeout=RERANK_STAGE_TIMEOUT_SECONDS, default=[], executor=executor)
 
     # Build a combined context (top N from reranked) for generation
     context_text = '\n\n---\n\n'.join([item.get('content') or str(item.get('metadata',{})) for item in reranked[:5]])
 
-    # Generation
-    final = generate_response(context_text, rewritten)
-
     return {
         'intent': intent,
         'rewritten_query': rewritten,
         'semantic_results': semantic,
         'lexical_results': lexical,
         'reranked': reranked,
-        'response': final
+        'stages': stages,
+        'partial': any(stage['status'] != 'ok' for stage in stages),
+        'context_text': context_text,
     }
+
+
+async def arun_multi_agent(query_text: str, chat_history: List[Dict]=None, executor=None) -> Dict:
+    """Run the multi-agent pipeline and return structured output.
+
+    Output includes: intent, rewritten_query, semantic_results, lexical_results, reranked,
+    response, stages and partial.
+    If `executor` (e.g. a process pool) is given, reranking runs there instead of in a thread.
+    """
+    result = await aretrieve_multi_agent(query_text, chat_history, executor)
+    context_text = result.pop('context_text')
+
+    # Generation
+    result['response'] = await _run_stage(
+        result['stages'], 'generation', generate_response, context_text, result['rewritten_query'],
+        timeout=GENERATION_STAGE_TIMEOUT_SECONDS,
+        default=f"(generation-error) no response within {GENERATION_STAGE_TIMEOUT_SECONDS:g}s")
+    result['partial'] = any(stage['status'] != 'ok' for stage in result['stages'])
+    return result
+
+
+async def astream_multi_agent(query_text: str, chat_history: List[Dict]=None,
+                              executor=None) -> Tuple[Dict, Iterator[str]]:
+    """Retrieve eagerly, generate lazily: returns the retrieval output and an iterator of
+    response chunks, so callers can send sources before the first token exists.
+
+    The caller drives generation, so it is responsible for holding it to
+    GENERATION_STAGE_TIMEOUT_SECONDS and appending the `generation` stage record.
+    """
+    result = await aretrieve_multi_agent(query_text, chat_history, executor)
+    context_text = result.pop('context_text')
+    return result, generate_response_stream(context_text, result['rewritten_query'])
+
+
+def _run_blocking(coro):
+    # Unlike asyncio.run, closing the loop does not wait for timed-out stage threads.
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def run_multi_agent(query_text: str, chat_history: List[Dict]=None, executor=None) -> Dict:
+    """Blocking wrapper around `arun_multi_agent` for scripts and threads without an event loop."""
+    return _run_blocking(arun_multi_agent(query_text, chat_history, executor))
+
+
+def stream_multi_agent(query_text: str, chat_history: List[Dict]=None, executor=None) -> Tuple[Dict, Iterator[str]]:
+    """Blocking wrapper around `astream_multi_agent`."""
+    return _run_blocking(astream_multi_agent(query_text, chat_history, executor))
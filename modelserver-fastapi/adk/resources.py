@@ -0,0 +1,107 @@
+"""Process-wide registry of expensive, long-lived clients (vector stores, embedding
+and LLM clients).
+
+Each resource is registered once with a factory and an optional warm-up hook.
+`get(name)` builds it on first use and returns the same instance afterwards, so
+request handlers never reopen the persisted Chroma store or reconstruct model
+clients. `warm_all()` builds and warms everything up front (call it from the
+application's startup hook) and `health()` reports per-resource readiness.
+
+A factory that raises is not cached: the error is recorded for `health()` and
+the next `get()` tries again, so a backend that comes up late is picked up
+without a restart.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class Resource:
+    def __init__(self, name: str, factory: Callable[[], Any], warm: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.factory = factory
+        self.warm = warm
+        self.instance: Any = None
+        self.ready = False
+        self.warmed = False
+        self.error: Optional[str] = None
+        self.created_at: Optional[float] = None
+        self.create_ms: Optional[float] = None
+        self.warm_ms: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "warmed": self.warmed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "create_ms": self.create_ms,
+            "warm_ms": self.warm_ms,
+        }
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self._resources: Dict[str, Resource] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], warm: Optional[Callable[[Any], None]] = None):
+        """Register (or replace) a resource; nothing is built until `get` or `warm_all`."""
+        self._resources[name] = Resource(name, factory, warm)
+
+    def get(self, name: str) -> Any:
+        resource = self._resources[name]
+        if resource.ready:
+            return resource.instance
+        with resource.lock:
+            if not resource.ready:
+                started = time.perf_counter()
+                try:
+                    resource.instance = resource.factory()
+                except Exception as e:
+                    resource.error = str(e)
+                    raise
+                resource.create_ms = round((time.perf_counter() - started) * 1000, 3)
+                resource.created_at = time.time()
+                resource.error = None
+                resource.ready = True
+                logging.info(f"Resource {name} created in {resource.create_ms} ms")
+        return resource.instance
+
+    def warm(self, name: str):
+        resource = self._resources[name]
+        instance = self.get(name)
+        if resource.warm is None or resource.warmed:
+            resource.warmed = True
+            return
+        started = time.perf_counter()
+        resource.warm(instance)
+        resource.warm_ms = round((time.perf_counter() - started) * 1000, 3)
+        resource.warmed = True
+
+    def warm_all(self):
+        """Build and warm every registered resource, logging (not raising) failures."""
+        for name in list(self._resources):
+            try:
+                self.warm(name)
+            except Exception as e:
+                self._resources[name].error = str(e)
+                logging.error(f"Resource {name} failed to warm up: {e}")
+
+    def reset(self, name: str):
+        """Drop the cached instance, e.g. after the underlying store was rebuilt."""
+        resource = self._resources[name]
+        with resource.lock:
+            resource.instance = None
+            resource.ready = False
+            resource.warmed = False
+
+    def ready(self) -> bool:
+        return all(resource.ready for resource in self._resources.values())
+
+    def health(self) -> Dict[str, Dict]:
+        return {name: resource.stats() for name, resource in self._resources.items()}
+
+
+registry = ResourceRegistry()
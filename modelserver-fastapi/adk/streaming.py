@@ -0,0 +1,69 @@
+"""Server-sent event bodies for streamed answers.
+
+`sse_answer_events` only needs an object with an async `is_disconnected()`
+(a Starlette `Request` in the server), so it can be driven directly in tests.
+"""
+import asyncio
+import json
+import logging
+import time
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_answer_events(http_request, sources, tokens, on_complete=None, done_extra=None,
+                            stages=None, timeout=None, executor=None):
+    """SSE body: one `sources` event, a `token` event per generated chunk, then `done`.
+
+    Chunks are pulled from the (blocking) token iterator in `executor` (default:
+    the loop's). If the client disconnects, the iterator is closed, which aborts
+    the upstream generation. Generation stops after `timeout` seconds in total;
+    the `done` event then carries the answer so far. With `stages` (the ADK stage
+    records), generation is appended to them as the `generation` stage and `done`
+    reports `stages` and `partial`. `on_complete` only sees complete answers. If
+    the iterator raises, an `error` event is sent instead of `done`.
+    """
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    parts = []
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield sse_event("sources", sources)
+        while True:
+            if await http_request.is_disconnected():
+                logging.info("Client disconnected, stopping generation")
+                return
+            remaining = None if timeout is None else max(timeout - (time.perf_counter() - started), 0)
+            try:
+                token = await asyncio.wait_for(loop.run_in_executor(executor, next, tokens, sentinel), remaining)
+            except asyncio.TimeoutError:
+                logging.warning(f"Streaming generation exceeded {timeout:g}s, sending the partial answer")
+                status = "timeout"
+                break
+            if token is sentinel:
+                break
+            parts.append(token)
+            yield sse_event("token", token)
+        answer = "".join(parts)
+        done = {"response": answer, **(done_extra or {})}
+        if stages is not None:
+            stages.append({"stage": "generation", "status": status,
+                           "ms": round((time.perf_counter() - started) * 1000, 3)})
+            done.update({"stages": stages, "partial": any(stage["status"] != "ok" for stage in stages)})
+        if on_complete is not None and status == "ok":
+            on_complete(answer)
+        yield sse_event("done", done)
+    except Exception as e:
+        logging.error(f"Streaming generation failed: {e}")
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running in a worker after a timeout; it is dropped when that call returns.
+                pass
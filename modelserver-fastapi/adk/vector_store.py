@@ -0,0 +1,347 @@
+"""Local vector store backed by memory-mapped, optionally quantized embeddings.
+
+Layout under `path`:
+
+- `vectors.bin`: one contiguous row per document, L2-normalized and stored as
+  float32, float16 or int8. int8 rows carry a per-vector scale in `scales.bin`
+  (float32) so `row * scale` restores the unit vector.
+- `documents.db`: SQLite side table mapping row -> id, content and metadata.
+- `meta.json`: dimension, dtype and committed row count, replaced atomically
+  after the data files are flushed; readers only map committed rows.
+
+Opening a store only maps the files, so startup does not depend on corpus size,
+and pages are shared between processes through the page cache. By default search
+is exact: rows are scored block by block with one matrix-vector product each,
+keeping a running top-k. With VECTOR_INDEX=ivf an IVF index (`ivf.npz`, see
+`ann_index`) limits scoring to the `nprobe` closest cells. float16 halves and
+int8 roughly quarters the bytes per vector relative to float32.
+
+The class mirrors the subset of the LangChain/Chroma interface this service
+uses (`add_documents`, `get`, `similarity_search_with_score`, `persist`), so it
+can stand in for Chroma. Scores are cosine distances (lower is closer), as with
+Chroma. One writer process at a time is assumed; readers pick up appended rows
+on their next search.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann_index import IVF_MIN_TRAIN_ROWS, IVF_NLIST, IVF_NPROBE, IVF_RETRAIN_GROWTH, VECTOR_INDEX, IVFIndex
+
+# "chroma" (default) or "local" selects the backend behind semantic_search and query_rag.
+VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND', 'chroma')
+VECTOR_STORE_PATH = os.environ.get('VECTOR_STORE_PATH', 'vectors')
+# Storage type for newly created stores: float32, float16 or int8.
+VECTOR_STORE_DTYPE = os.environ.get('VECTOR_STORE_DTYPE', 'float16')
+VECTOR_SEARCH_BLOCK_ROWS = int(os.environ.get('VECTOR_SEARCH_BLOCK_ROWS', '8192'))
+
+DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+
+
+class StoredDocument:
+    """Search hit with the `page_content`/`metadata` attributes of a LangChain Document."""
+    __slots__ = ('id', 'page_content', 'metadata')
+
+    def __init__(self, id: str, page_content: str, metadata: Dict):
+        self.id = id
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """L2-normalize rows and convert them to `dtype`; int8 also returns per-row scales."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    if dtype != 'int8':
+        return unit.astype(DTYPES[dtype]), None
+    scales = np.abs(unit).max(axis=1) / 127.0
+    codes = np.divide(unit, scales[:, None], out=np.zeros_like(unit), where=scales[:, None] > 0)
+    return np.rint(codes).astype(np.int8), scales.astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores, kind='stable')
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind='stable')]
+
+
+class LocalVectorStore:
+    def __init__(self, path: str = VECTOR_STORE_PATH, embedding_function=None, dtype: str = VECTOR_STORE_DTYPE,
+                 block_rows: int = VECTOR_SEARCH_BLOCK_ROWS, index: str = VECTOR_INDEX, nprobe: int = IVF_NPROBE):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype!r}; use one of {sorted(DTYPES)}")
+        self.path = path
+        self.embedding_function = embedding_function
+        self.block_rows = block_rows
+        self.index = index
+        self.nprobe = nprobe
+        self._ivf_path = os.path.join(path, 'ivf.npz')
+        self._ivf: Optional[IVFIndex] = None
+        self._ivf_mtime = None
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, 'meta.json')
+        self._vectors_path = os.path.join(path, 'vectors.bin')
+        self._scales_path = os.path.join(path, 'scales.bin')
+        self._db = sqlite3.connect(os.path.join(path, 'documents.db'), check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS documents ('
+                         'row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, content TEXT, metadata TEXT)')
+        self._db.commit()
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        self.meta = {'dim': None, 'dtype': dtype, 'count': 0}
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._reload()
+
+    # -- mapping ---------------------------------------------------------------
+
+    def _reload(self):
+        """(Re)map the committed rows if meta.json changed since the last look."""
+        if self.index == 'ivf':
+            self._reload_ivf()
+        try:
+            mtime = os.stat(self._meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._meta_mtime:
+            return
+        with open(self._meta_path) as f:
+            self.meta = json.load(f)
+        self._meta_mtime = mtime
+        count, dim, dtype = self.meta['count'], self.meta['dim'], self.meta['dtype']
+        if not count:
+            self._vectors = self._scales = None
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype=DTYPES[dtype], mode='r', shape=(count, dim))
+        self._scales = (np.memmap(self._scales_path, dtype=np.float32, mode='r', shape=(count,))
+                        if dtype == 'int8' else None)
+
+    def _reload_ivf(self):
+        try:
+            mtime = os.stat(self._ivf_path).st_mtime_ns
+        except FileNotFoundError:
+            self._ivf = self._ivf_mtime = None
+            return
+        if mtime != self._ivf_mtime:
+            self._ivf = IVFIndex.load(self._ivf_path)
+            self._ivf_mtime = mtime
+
+    def _update_ivf(self, rows: List[int]):
+        """Assign freshly written rows to IVF cells, training or retraining when due."""
+        count = self.meta['count']
+        ivf = self._ivf
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        # Rows appended while the index was off would leave a gap; retrain to cover them.
+        gap = ivf is not None and count - len(ivf) > int((rows >= len(ivf)).sum())
+        if ivf is None or gap or count >= ivf.trained_rows * IVF_RETRAIN_GROWTH:
+            if count < IVF_MIN_TRAIN_ROWS:
+                return
+            ivf = IVFIndex.train(self.vectors_for, count, nlist=IVF_NLIST)
+        else:
+            ivf.update(rows, self.vectors_for(rows))
+        ivf.save(self._ivf_path)
+        self._ivf = ivf
+        self._ivf_mtime = os.stat(self._ivf_path).st_mtime_ns
+
+    def _write_meta(self):
+        tmp = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def __len__(self) -> int:
+        self._reload()
+        return self.meta['count']
+
+    @property
+    def bytes_per_vector(self) -> int:
+        dim = self.meta['dim'] or 0
+        return dim * np.dtype(DTYPES[self.meta['dtype']]).itemsize + (4 if self.meta['dtype'] == 'int8' else 0)
+
+    # -- writes ----------------------------------------------------------------
+
+    def add_embeddings(self, ids: Sequence[str], embeddings, contents: Sequence[str],
+                       metadatas: Optional[Sequence[Dict]] = None) -> List[str]:
+        """Store precomputed embeddings; an existing id is overwritten in place."""
+        ids = [str(i) for i in ids]
+        if not ids:
+            return []
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        with self._lock:
+            self._reload()
+            if self.meta['dim'] is None:
+                self.meta['dim'] = int(vectors.shape[1])
+            elif vectors.shape[1] != self.meta['dim']:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.meta['dim']}")
+            codes, scales = quantize(vectors, self.meta['dtype'])
+            row_bytes = codes.shape[1] * codes.itemsize
+
+            existing = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                existing.update(self._db.execute(
+                    f"SELECT id, row FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+            count = self.meta['count']
+            rows = []
+            for doc_id in ids:
+                if doc_id not in existing:
+                    existing[doc_id] = count
+                    count += 1
+                rows.append(existing[doc_id])
+
+            with open(self._vectors_path, 'r+b' if os.path.exists(self._vectors_path) else 'w+b') as f:
+                for row, code in zip(rows, codes):
+                    f.seek(row * row_bytes)
+                    f.write(code.tobytes())
+            if scales is not None:
+                with open(self._scales_path, 'r+b' if os.path.exists(self._scales_path) else 'w+b') as f:
+                    for row, scale in zip(rows, scales):
+                        f.seek(row * 4)
+                        f.write(scale.tobytes())
+
+            self._db.executemany('INSERT OR REPLACE INTO documents (row, id, content, metadata) VALUES (?, ?, ?, ?)',
+                                 [(row, doc_id, content, json.dumps(metadata or {}, default=str))
+                                  for row, doc_id, content, metadata in zip(rows, ids, contents, metadatas)])
+            self._db.commit()
+            self.meta['count'] = count
+            self._write_meta()
+            self._reload()
+            if self.index == 'ivf':
+                self._update_ivf(rows)
+        return ids
+
+    def _embed_documents(self, texts: List[str]):
+        embed = getattr(self.embedding_function, 'embed_documents', self.embedding_function)
+        return embed(texts)
+
+    def _embed_query(self, text: str):
+        embed = getattr(self.embedding_function, 'embed_query', None)
+        return embed(text) if embed is not None else self.embedding_function([text])[0]
+
+    def add_texts(self, texts: Sequence[str], metadatas: Optional[Sequence[Dict]] = None,
+                  ids: Optional[Sequence[str]] = None) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(self), len(self) + len(texts))]
+        return self.add_embeddings(ids, self._embed_documents(texts), texts, metadatas)
+
+    def add_documents(self, documents, ids: Optional[Sequence[str]] = None) -> List[str]:
+        return self.add_texts([d.page_content for d in documents], [d.metadata for d in documents], ids)
+
+    def persist(self):
+        """Writes are durable when `add_*` returns; kept for Chroma compatibility."""
+
+    # -- reads -----------------------------------------------------------------
+
+    def get(self, ids: Optional[Sequence[str]] = None, limit: Optional[int] = None, include=None) -> Dict:
+        """Chroma-style lookup: {'ids': [...], 'documents': [...], 'metadatas': [...]}."""
+        include = ['documents', 'metadatas'] if include is None else include
+        query = 'SELECT id, content, metadata FROM documents'
+        params: list = []
+        if ids is not None:
+            query += f" WHERE id IN ({','.join('?' * len(ids))})"
+            params = [str(i) for i in ids]
+        query += ' ORDER BY row'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        result = {'ids': [r[0] for r in rows]}
+        if 'documents' in include:
+            result['documents'] = [r[1] for r in rows]
+        if 'metadatas' in include:
+            result['metadatas'] = [json.loads(r[2] or '{}') for r in rows]
+        return result
+
+    def vectors_for(self, rows) -> np.ndarray:
+        """Dequantized unit-norm float32 vectors for a slice or an array of rows."""
+        block = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            block *= np.asarray(self._scales[rows], dtype=np.float32)[:, None]
+        return block
+
+    def search_vectors(self, query_vector, k: int = 5, nprobe: Optional[int] = None,
+                       exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows by cosine similarity: (rows, similarities), best first.
+
+        With the IVF index (and unless `exact`), only the `nprobe` closest cells plus
+        any rows not yet covered by the index are scored; otherwise every row is.
+        """
+        with self._lock:
+            self._reload()
+            vectors, scales, ivf = self._vectors, self._scales, self._ivf
+        if vectors is None or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+
+        count = vectors.shape[0]
+        if ivf is not None and not exact:
+            covered = min(len(ivf), count)
+            rows = ivf.probe(query, nprobe or self.nprobe)
+            rows = np.concatenate([rows[rows < covered], np.arange(covered, count, dtype=np.int64)])
+            blocks = [rows[start:start + self.block_rows] for start in range(0, rows.shape[0], self.block_rows)]
+        else:
+            blocks = [slice(start, min(start + self.block_rows, count)) for start in range(0, count, self.block_rows)]
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_sims = np.zeros(0, dtype=np.float32)
+        for block in blocks:
+            sims = np.asarray(vectors[block], dtype=np.float32) @ query
+            if scales is not None:
+                sims *= scales[block]
+            block_rows = np.arange(block.start, block.stop, dtype=np.int64) if isinstance(block, slice) else block
+            candidates = np.concatenate([best_sims, sims])
+            rows = np.concatenate([best_rows, block_rows])
+            keep = top_k(candidates, k)
+            best_rows, best_sims = rows[keep], candidates[keep]
+        return best_rows, best_sims
+
+    def documents_for_rows(self, rows: Sequence[int]) -> List[StoredDocument]:
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        with self._lock:
+            found = {r[0]: r for r in self._db.execute(
+                f"SELECT row, id, content, metadata FROM documents WHERE row IN ({','.join('?' * len(rows))})",
+                rows).fetchall()}
+        return [StoredDocument(found[r][1], found[r][2], json.loads(found[r][3] or '{}')) for r in rows]
+
+    def similarity_search_by_vector_with_score(self, query_vector, k: int = 5) -> List[Tuple[StoredDocument, float]]:
+        rows, sims = self.search_vectors(query_vector, k)
+        return list(zip(self.documents_for_rows(rows), (1.0 - sims.astype(np.float64)).tolist()))
+
+    def similarity_search_with_score(self, query: str, k: int = 5) -> List[Tuple[StoredDocument, float]]:
+        return self.similarity_search_by_vector_with_score(self._embed_query(query), k)
+
+    def stats(self) -> Dict:
+        self._reload()
+        return {
+            'path': self.path,
+            'count': self.meta['count'],
+            'dim': self.meta['dim'],
+            'dtype': self.meta['dtype'],
+            'bytes_per_vector': self.bytes_per_vector,
+            'index': self.index,
+            'ivf_nlist': self._ivf.nlist if self._ivf is not None else None,
+            'ivf_rows': len(self._ivf) if self._ivf is not None else 0,
+            'nprobe': self.nprobe,
+        }
+
+
+def open_vector_store(embedding_function, chroma_path: str, backend: str = VECTOR_BACKEND):
+    """The configured store: LocalVectorStore at VECTOR_STORE_PATH, or Chroma at `chroma_path`."""
+    if backend == 'local':
+        return LocalVectorStore(VECTOR_STORE_PATH, embedding_function=embedding_function)
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=chroma_path, embedding_function=embedding_function)
@@ -1,46 +1,147 @@
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-import requests
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal
 import os
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-import numpy as np
-from scipy.spatial.distance import cosine
-from sklearn.feature_extraction.text import CountVectorizer
 import mlflow.pyfunc
 import logging
-import math
 import asyncio
+import threading
+import time
 import httpx
-from langchain_community.vectorstores import Chroma
 from langchain.prompts import ChatPromptTemplate
 from langchain_community.llms.ollama import Ollama
 from langchain_community.embeddings.ollama import OllamaEmbeddings
 from langchain.document_loaders.pdf import PyPDFDirectoryLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from adk import mongo_store
+from adk.answer_cache import SemanticAnswerCache, index_version
+from adk.generator import LLM_BACKEND, LocalLLM
+from adk.embedding_cache import CachedEmbeddings, get_cache as get_embedding_cache
+from adk.http_client import close_clients, get_async_client, get_sync_client
+from adk.resources import registry
+from adk.streaming import sse_answer_events
+from adk.vector_store import VECTOR_BACKEND, VECTOR_STORE_PATH, open_vector_store
+from recommender.batcher import PredictBatcher
+from recommender.catalog import CatalogCache
+from recommender.genres import GENRE_INDICES, genre_names_to_mask, mask_to_genre_names
+from recommender.index import rank_by_overlap
+from recommender.model_manager import ModelManager
+from recommender.prediction_cache import PredictionMemo
+from recommender.process_pool import ScoringPool
+from recommender.result_cache import ResultCache, selection_key
+from recommender.scoring import rank_movies, rank_movies_batch
+from recommender.shadow import ShadowScorer
+from recommender.shared_catalog import SharedCatalog
+from recommender.tfidf import TfidfIndexCache, rank_movies_tfidf
+
 EXPRESSJS_URL = "http://127.0.0.1:3000"
 OLLAMA_URL = "http://127.0.0.1:11434"
 MLFLOW_TRACKING_URI = "http://127.0.0.1:5000"
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+CATALOG_FETCH_TIMEOUT_SECONDS = float(os.getenv("CATALOG_FETCH_TIMEOUT_SECONDS", "60"))
+# With MOVIE_SOURCE=mongo the catalog is streamed straight from MongoDB; 0 reads it all.
+MONGODB_CATALOG_LIMIT = int(os.getenv("MONGODB_CATALOG_LIMIT", "0"))
+# The catalog is read from Express GET /movies in pages of this many movies.
+EXPRESS_MOVIES_PAGE_SIZE = int(os.getenv("EXPRESS_MOVIES_PAGE_SIZE", "500"))
+# Catalog fields kept per movie: what the recommenders score on plus what
+# /similar returns, so /similar is answered from the catalog alone.
+CATALOG_FIELDS = ('_id', 'title', 'year', 'genres', 'cast', 'poster')
+# With several uvicorn workers, point this at a shared directory (ideally tmpfs,
+# e.g. /dev/shm/movie-catalog) so one worker fetches the catalog and all of
+# them memory-map the same arrays instead of each holding a private copy.
+SHARED_CATALOG_DIR = os.getenv("SHARED_CATALOG_DIR")
+SHARED_CATALOG_POLL_SECONDS = float(os.getenv("SHARED_CATALOG_POLL_SECONDS", "2"))
+# "genre" scores genre-bit cosine similarity; "tfidf" scores sparse TF-IDF
+# similarity over genres, cast and directors. Requests may override it.
+RECOMMENDER_MODE = os.getenv("RECOMMENDER_MODE", "genre")
+SIMILAR_LIMIT = int(os.getenv("SIMILAR_LIMIT", "10"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
 
-# Define model details
-MODEL_NAME = "MovieGenreGBModel"
-MODEL_VERSION = 1
-
-# Load model from MLflow
-model_uri = f"models:/{MODEL_NAME}/{MODEL_VERSION}"
-model = mlflow.pyfunc.load_model(model_uri=model_uri)
+# Define model details. Set MODEL_STAGE or MODEL_ALIAS to follow the registry;
+# otherwise MODEL_VERSION is pinned.
+MODEL_NAME = os.getenv("MODEL_NAME", "MovieGenreGBModel")
+MODEL_STAGE = os.getenv("MODEL_STAGE")
+MODEL_ALIAS = os.getenv("MODEL_ALIAS")
+MODEL_VERSION = os.getenv("MODEL_VERSION", None if (MODEL_STAGE or MODEL_ALIAS) else "1")
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "60"))
+# Comma-separated registry names scored in the background for comparison,
+# e.g. "MovieGenreRFModel,MovieGenreLRModel,MovieGenreNNModel".
+SHADOW_MODELS = [name.strip() for name in os.getenv("SHADOW_MODELS", "").split(",") if name.strip()]
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+# Worker processes for CPU-bound scoring and reranking; 0 keeps it in-process.
+SCORING_PROCESSES = int(os.getenv("SCORING_PROCESSES", "0"))
+# Concurrent predict calls are coalesced for up to this long; 0 disables batching.
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "4096"))
+# Longest a caller waits for its batched prediction before giving up.
+PREDICT_BATCH_TIMEOUT_SECONDS = float(os.getenv("PREDICT_BATCH_TIMEOUT_SECONDS", "30"))
+
+# Ratings depend only on the 23 genre bits, so memoize them per genre mask
+prediction_memo = PredictionMemo()
+
+# The model is loaded from MLflow in the background and hot-swapped when the
+# registry points at a new version; the memo is re-warmed before each swap.
+model_manager = ModelManager(MODEL_NAME, version=MODEL_VERSION, stage=MODEL_STAGE,
+                             alias=MODEL_ALIAS, poll_seconds=MODEL_POLL_SECONDS)
+
+predict_batcher = None
+
+def install_model(model, version):
+    """Route the memo's misses for a newly loaded model through a fresh batcher, warming it first."""
+    global predict_batcher
+    batcher = None
+    predict = model.predict
+    if PREDICT_BATCH_MAX_WAIT_MS > 0:
+        batcher = PredictBatcher(model.predict, max_batch_rows=PREDICT_BATCH_MAX_ROWS,
+                                 max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+                                 result_timeout=PREDICT_BATCH_TIMEOUT_SECONDS)
+        predict = batcher.predict
+
+    snapshot = catalog.current
+    try:
+        prediction_memo.set_model(predict, version, warm_masks=snapshot.genre_masks if snapshot else None)
+    except Exception:
+        # ModelManager retries the swap on its next poll; don't leak this batcher's thread.
+        if batcher is not None:
+            batcher.close()
+        raise
+    previous, predict_batcher = predict_batcher, batcher
+    if previous is not None:
+        previous.close()
+
+model_manager.add_listener(install_model)
+
+scoring_pool = ScoringPool(SCORING_PROCESSES) if SCORING_PROCESSES > 0 else None
+
+def rerank_executor():
+    return scoring_pool.executor if scoring_pool is not None else None
+
+shadow_scorer = ShadowScorer(
+    {
+        name: ModelManager(name, version=None if (MODEL_STAGE or MODEL_ALIAS) else "1", stage=MODEL_STAGE,
+                           alias=MODEL_ALIAS, poll_seconds=MODEL_POLL_SECONDS)
+        for name in SHADOW_MODELS
+    },
+    primary=model_manager,
+    max_workers=SHADOW_WORKERS,
+)
 
 
 DATA_PATH = "data"
 CHROMA_PATH = "chroma"
+# Directory whose contents version the semantic answer cache (see VECTOR_BACKEND).
+INDEX_PATH = VECTOR_STORE_PATH if VECTOR_BACKEND == "local" else CHROMA_PATH
 PROMPT_TEMPLATE = """
 Answer the question based only on the following context:
 
@@ -56,27 +157,62 @@ app = FastAPI()
 
 class QueryRequest(BaseModel):
     query_text: str
+    # Stream the answer as server-sent events: sources first, then tokens, then done.
+    stream: bool = False
 
 def get_embedding_function():
+    # Repeated questions reuse cached query embeddings instead of calling Ollama again.
     embeddings = OllamaEmbeddings(model="gemma2:2b")
-    return embeddings
-
-def query_rag(query_text: str):
-    # Prepare the DB.
-    embedding_function = get_embedding_function()
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
-
-    # Search the DB.
+    return CachedEmbeddings(embeddings.embed_documents, model="ollama/gemma2:2b",
+                            embed_query=embeddings.embed_query)
+
+# The RAG stack is built once per process and shared by every /chat and /search call.
+registry.register("rag_embeddings", get_embedding_function,
+                  warm=lambda embeddings: embeddings.embed_query("warm up"))
+registry.register("rag_store", lambda: open_vector_store(registry.get("rag_embeddings"), CHROMA_PATH),
+                  warm=lambda db: db.get(limit=1))
+registry.register("rag_prompt", lambda: ChatPromptTemplate.from_template(PROMPT_TEMPLATE))
+registry.register("rag_llm", lambda: LocalLLM() if LLM_BACKEND == "local" else Ollama(model="gemma2:2b"))
+
+def retrieve_rag_context(query_text: str):
+    """Search the DB; returns the prompt context and the sources it came from."""
+    db = registry.get("rag_store")
     results = db.similarity_search_with_score(query_text, k=5)
 
     context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-    prompt = prompt_template.format(context=context_text, question=query_text)
+    sources = [{"metadata": doc.metadata, "score": float(score)} for doc, score in results]
+    return context_text, sources
+
+def query_rag_with_sources(query_text: str):
+    context_text, sources = retrieve_rag_context(query_text)
+    prompt = registry.get("rag_prompt").format(context=context_text, question=query_text)
 
-    model = Ollama(model="gemma2:2b")
-    response_text = model.invoke(prompt)
+    response_text = registry.get("rag_llm").invoke(prompt)
     
-    return response_text
+    return response_text, sources
+
+def query_rag(query_text: str):
+    return query_rag_with_sources(query_text)[0]
+
+def stream_rag(query_text: str):
+    """Retrieve now, generate lazily: (sources, iterator of response chunks)."""
+    context_text, sources = retrieve_rag_context(query_text)
+    prompt = registry.get("rag_prompt").format(context=context_text, question=query_text)
+    return sources, registry.get("rag_llm").stream(prompt)
+
+# Near-duplicate questions reuse earlier answers while the vector index is unchanged.
+chat_answers = SemanticAnswerCache(lambda question: registry.get("rag_embeddings").embed_query(question))
+search_answers = SemanticAnswerCache(lambda question: registry.get("adk_embeddings").embed_query(question))
+
+def is_cacheable_answer(answer) -> bool:
+    return bool(answer) and '(generation-error)' not in str(answer)
+
+def cached_answer_response(entry):
+    return {
+        "response": entry.answer,
+        "sources": entry.sources,
+        "cache": {"question": entry.question, "similarity": round(entry.similarity, 4)},
+    }
 
 app = FastAPI()
 
@@ -92,18 +228,33 @@ app.add_middleware(
 # Define request models
 class MovieIdsRequest(BaseModel):
     movieIds: List[str]
+    k: int = Field(5, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    mode: Literal["genre", "tfidf"] = RECOMMENDER_MODE
+
+class BatchMovieIdsRequest(BaseModel):
+    movieIds: List[List[str]]
+    k: int = Field(5, ge=1, le=100)
 
 class SimilarRequest(BaseModel):
     genres: List[str]
     cast: List[str]
     title: str 
+    limit: int = Field(SIMILAR_LIMIT, ge=1, le=100)
 
 class GenerateRequest(BaseModel):
     model: str
     prompt: str
 
 # Unified function to fetch movie details or similar movies
-def fetch_movie_data(movie_ids: List[str] = None, genres: List[str] = None, cast: List[str] = None):
+async def fetch_movie_data(movie_ids: List[str] = None, genres: List[str] = None, cast: List[str] = None):
+    if movie_ids and mongo_store.is_enabled():
+        try:
+            return await asyncio.to_thread(mongo_store.find_movies_by_ids, movie_ids)
+        except Exception as e:
+            print(f"Error fetching data from MongoDB: {e}")
+            return None
+
     try:
         if movie_ids:
             url = f"{EXPRESSJS_URL}/movies"
@@ -114,118 +265,183 @@ def fetch_movie_data(movie_ids: List[str] = None, genres: List[str] = None, cast
         else:
             raise ValueError("Insufficient parameters provided for request")
 
-        response = requests.post(url, json=payload)
+        response = await get_async_client().post(url, json=payload)
         response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error fetching data from Express.js: {e}")
         return None
     except ValueError as e:
         print(e)
         return None
 
+def catalog_movie(movie):
+    """Trim a full movie document to CATALOG_FIELDS plus its IMDb rating."""
+    trimmed = {field: movie[field] for field in CATALOG_FIELDS if field in movie}
+    rating = (movie.get('imdb') or {}).get('rating')
+    if rating is not None:
+        trimmed['imdb'] = {'rating': rating}
+    return trimmed
+
 def fetch_movies():
-    url = f"{EXPRESSJS_URL}/movies"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    """Every movie in the collection, trimmed to the catalog fields.
 
-# Functions for processing and transforming data
-def genre_names_to_vector(genres, num_genres=23):
-    genre_vector = [0] * num_genres
-    genre_indices = {
-        'Action': 0, 'Adventure': 1, 'Animation': 2, 'Biography': 3,
-        'Comedy': 4, 'Crime': 5, 'Documentary': 6, 'Drama': 7, 'Family': 8,
-        'Fantasy': 9, 'FilmNoir': 10, 'History': 11, 'Horror': 12, 'Music': 13,
-        'Musical': 14, 'Mystery': 15, 'Romance': 16, 'SciFi': 17, 'Short': 18,
-        'Sport': 19, 'Thriller': 20, 'War': 21, 'Western': 22
-    }
-    for genre in genres:
-        if genre in genre_indices:
-            genre_vector[genre_indices[genre]] = 1
-    return genre_vector
+    Runs on the catalog refresh thread, so it uses blocking clients. Express
+    is paged through to the end, like the lexical index load.
+    """
+    if mongo_store.is_enabled():
+        return list(mongo_store.iter_movies(projection=mongo_store.CATALOG_PROJECTION,
+                                            limit=MONGODB_CATALOG_LIMIT))
+
+    movies = []
+    page = 1
+    while True:
+        response = get_sync_client().get(f"{EXPRESSJS_URL}/movies",
+                                         params={"page": page, "limit": EXPRESS_MOVIES_PAGE_SIZE, "fields": "all"},
+                                         timeout=CATALOG_FETCH_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        batch = response.json()
+        movies.extend(catalog_movie(movie) for movie in batch)
+        if len(batch) < EXPRESS_MOVIES_PAGE_SIZE:
+            return movies
+        page += 1
+
+# Parsed catalog + genre matrix, refreshed on a TTL or via /admin/refresh-catalog
+if SHARED_CATALOG_DIR:
+    catalog = SharedCatalog(SHARED_CATALOG_DIR, fetch_movies, ttl_seconds=CATALOG_TTL_SECONDS,
+                            poll_seconds=SHARED_CATALOG_POLL_SECONDS,
+                            wait_seconds=CATALOG_FETCH_TIMEOUT_SECONDS)
+else:
+    catalog = CatalogCache(fetch_movies, ttl_seconds=CATALOG_TTL_SECONDS)
+catalog.add_listener(lambda snapshot: prediction_memo.warm(snapshot.genre_masks))
+
+# Finished /recommend responses keyed on (selection, model version, catalog version, mode, page)
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+catalog.add_listener(lambda snapshot: result_cache.clear())
+
+# Sparse TF-IDF matrix per catalog snapshot, built eagerly only when it is the default mode
+tfidf_indexes = TfidfIndexCache()
+if RECOMMENDER_MODE == "tfidf":
+    catalog.add_listener(tfidf_indexes.get)
+
+async def fetch_selected_movies(movie_ids: List[str]):
+    """Resolve the selected movies from the catalog cache, falling back to Express."""
+    try:
+        snapshot = await run_in_threadpool(catalog.get)
+        selected = snapshot.lookup(movie_ids)
+        if selected and len(selected) == len(movie_ids):
+            return selected
+    except Exception as e:
+        logging.error(f"Error reading catalog cache: {e}")
+    return await fetch_movie_data(movie_ids=movie_ids)
+
+async def fetch_selected_movies_batch(id_lists: List[List[str]]):
+    """Resolve many selections at once.
+
+    Ids missing from the catalog cache are fetched from Express in one request.
+    """
+    snapshot = await run_in_threadpool(catalog.get)
+    missing = sorted({i for ids in id_lists for i in ids if i not in snapshot.id_index})
+    fetched = {}
+    if missing:
+        fetched = {str(m.get('_id')): m for m in (await fetch_movie_data(movie_ids=missing) or [])}
+
+    selections = []
+    for ids in id_lists:
+        selected = snapshot.lookup(ids)
+        selected.extend(fetched[i] for i in ids if i in fetched)
+        selections.append(selected)
+    return selections
 
+# Functions for processing and transforming data
 def process_movies(movies_data):
-    genre_names = [
-        'Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime',
-        'Documentary', 'Drama', 'Family', 'Fantasy', 'FilmNoir', 'History',
-        'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'SciFi', 'Short',
-        'Sport', 'Thriller', 'War', 'Western'
-    ]
-
-    processed_data = []
-    genre_vector = {genre: 0 for genre in genre_names}
+    """Combine the genres of the selected movies into one packed genre mask."""
+    selected_mask = 0
     for movie in movies_data:
-        for genre in movie['genres']:
-            if genre in genre_vector:
-                genre_vector[genre] = 1
-
-    return genre_vector
+        selected_mask |= genre_names_to_mask(movie['genres'])
+    return selected_mask
 
 
-def recommend_based_on_genres(selected_movies):
-    logging.info(f"Selected Movies Combined Genres: {selected_movies}")
+def recommend_based_on_genres(selected_mask, k=None, offset=0):
+    logging.info(f"Selected Movies Combined Genres: {mask_to_genre_names(selected_mask)}")
 
     try:
-        selected_genre_vectors_np = np.array(list(selected_movies.values()), dtype=np.int64).reshape(1, 23)
+        snapshot = catalog.get()
     except Exception as e:
-        logging.error(f"Error processing selected movies' genres: {e}")
+        logging.error(f"Error fetching movies: {e}")
         return []
 
+    # Only movies sharing a genre with the selection can score above zero. If
+    # there are fewer of those than requested, scan the whole catalog so the
+    # zero-score tail is filled in catalog order as before.
+    candidates = snapshot.genre_index.candidates(selected_mask)
+    if k is not None and candidates.size < offset + k:
+        candidates = None
+
+    # One memoized predict over the packed genre masks and popcount-based
+    # cosine similarities for every candidate. Shadow models, if configured,
+    # score the same candidates in the background.
+    predict_masks = prediction_memo.predict_masks
+    if shadow_scorer.enabled:
+        predict_masks = shadow_scorer.wrap(predict_masks, selected_mask, offset + (k or 5))
     try:
-        movies = fetch_movies()
+        return rank_movies(snapshot.movies, snapshot.genre_masks, selected_mask,
+                           predict_masks, rows=candidates, k=k, offset=offset)
     except Exception as e:
-        logging.error(f"Error fetching movies: {e}")
+        logging.error(f"Error scoring movies: {e}")
         return []
 
-    similar_movies = []
-
-    for movie in movies:
-        try:
-            movie_genres = genre_names_to_vector(movie.get("genres", []))
-            movie_genres_np = np.array(movie_genres, dtype=np.int64).reshape(1, 23)
-        except Exception as e:
-            logging.error(f"Error processing genres for movie {movie.get('title', 'Unknown')}: {e}")
-            continue
+def recommend_based_on_tfidf(selected_movies, k=None, offset=0):
+    try:
+        snapshot = catalog.get()
+        index = tfidf_indexes.get(snapshot)
+    except Exception as e:
+        logging.error(f"Error preparing TF-IDF index: {e}")
+        return []
 
-        if np.any(movie_genres_np) and selected_genre_vectors_np.size > 0:
-            try:
-                predicted_rating = model.predict(movie_genres_np)[0]
-            except Exception as e:
-                logging.error(f"Error predicting rating for movie {movie.get('title', 'Unknown')}: {e}")
-                continue
-
-            genre_similarity_scores = []
-
-            for selected_genre_vector in selected_genre_vectors_np:
-                if np.any(selected_genre_vector):
-                    try:
-                        score = 1 - cosine(movie_genres_np.flatten(), selected_genre_vector.flatten())
-                        genre_similarity_scores.append(score)
-                    except Exception as e:
-                        logging.error(f"Error computing similarity for movie {movie.get('title', 'Unknown')}: {e}")
-
-            genre_similarity = max(genre_similarity_scores) if genre_similarity_scores else 0.0
-            genre_similarity = 0.0 if math.isnan(genre_similarity) else genre_similarity
-
-            combined_score = predicted_rating * genre_similarity
-
-            similar_movies.append(
-                {
-                    "title": movie.get("title", "Unknown"),
-                    "genres": movie.get("genres", []),
-                    "cast": movie.get("cast", []),
-                    "predicted_rating": float(predicted_rating),
-                    "genre_similarity": float(genre_similarity),
-                    "combined_score": float(combined_score)
-                }
-            )
-        else:
-            logging.info(f"Skipping movie with invalid genres: {movie.get('title', 'Unknown')}")
+    # One sparse matrix-vector product against the catalog, then the memoized
+    # rating prediction for the rows that matched.
+    try:
+        return rank_movies_tfidf(snapshot, index, selected_movies, prediction_memo.predict_masks,
+                                 k=k, offset=offset)
+    except Exception as e:
+        logging.error(f"Error scoring movies: {e}")
+        return []
 
-    similar_movies.sort(key=lambda x: x["combined_score"], reverse=True)
+def catalog_covers_collection(snapshot) -> bool:
+    """False only when MONGODB_CATALOG_LIMIT cut the catalog short of the collection."""
+    if mongo_store.is_enabled() and MONGODB_CATALOG_LIMIT:
+        return len(snapshot) < MONGODB_CATALOG_LIMIT
+    return True
+
+def similar_from_catalog(snapshot, genres, cast, title, limit):
+    """Answer /similar from the catalog's cast and genre inverted indexes.
+
+    Movies are ranked by how many of the given cast members (or genres) they
+    share, then by catalog order; the source title is excluded. Results are
+    the catalog documents (CATALOG_FIELDS), so no Express or MongoDB call is
+    made. Returns None when the catalog cannot stand in for Express: it holds
+    only part of the collection, or a genre is outside GENRE_NAMES and so
+    missing from the genre index.
+    """
+    if not catalog_covers_collection(snapshot) or any(genre not in GENRE_INDICES for genre in genres):
+        return None
 
-    return similar_movies
+    def pick(postings):
+        rows, _counts = rank_by_overlap(postings)
+        picked = []
+        for row in rows.tolist():
+            movie = snapshot.movies[row]
+            if movie.get('title') != title:
+                picked.append(movie)
+                if len(picked) >= limit:
+                    break
+        return picked
+
+    return {
+        "actors": pick(snapshot.cast_index.lookup(cast)),
+        "genres": pick(snapshot.genre_index.lookup(genre_names_to_mask(genres)))
+    }
 
 def transform_recommendations(recommendations):
     transformed_recommendations = []
@@ -242,26 +458,120 @@ def transform_recommendations(recommendations):
     
     return {"recommendations": transformed_recommendations}
 
+@app.on_event("startup")
+def warm_catalog():
+    model_manager.start()
+    shadow_scorer.start()
+    try:
+        import adk.hybrid_retriever  # registers the ADK retrieval resources
+    except Exception as e:
+        logging.error(f"ADK retriever unavailable: {e}")
+    # Opening the vector store and reaching Ollama can be slow; warm them without delaying startup.
+    threading.Thread(target=registry.warm_all, name="resource-warmup", daemon=True).start()
+    try:
+        catalog.refresh()
+    except Exception as e:
+        logging.error(f"Catalog warm-up failed, will load on first request: {e}")
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    model_manager.stop()
+    shadow_scorer.stop()
+    if scoring_pool is not None:
+        scoring_pool.shutdown()
+    await close_clients()
+
 # Define API endpoints
 @app.post("/recommend")
 async def recommend(request: MovieIdsRequest):
-    movie_ids = request.movieIds
-    selected_movies = fetch_movie_data(movie_ids=movie_ids)
+    if not model_manager.ready:
+        raise HTTPException(status_code=503, detail="Rating model is still loading")
+
+    # A selection is a set: duplicate ids would weigh a movie twice in the tfidf
+    # profile while sharing the de-duplicated result-cache key.
+    movie_ids = list(dict.fromkeys(request.movieIds))
+    model_version = prediction_memo.model_version
+    snapshot = catalog.current
+    cache_key = (selection_key(movie_ids), model_version, snapshot.version if snapshot else 0,
+                 request.mode, request.k, request.offset)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    selected_movies = await fetch_selected_movies(movie_ids)
 
     if not selected_movies:
         raise HTTPException(status_code=500, detail="Error fetching movie details")
 
-    processed_movies = process_movies(selected_movies)
-    recommended_movies = recommend_based_on_genres(processed_movies)
-    top_5_movies = recommended_movies[:5]
-
-    logging.info(f"Movie Recommendations: {top_5_movies}")
-    response = transform_recommendations(top_5_movies)
+    if request.mode == "tfidf":
+        top_movies = await run_in_threadpool(recommend_based_on_tfidf, selected_movies,
+                                             k=request.k, offset=request.offset)
+    else:
+        selected_mask = process_movies(selected_movies)
+        top_movies = None
+        if scoring_pool is not None:
+            try:
+                snapshot = await run_in_threadpool(catalog.get)
+                top_movies = await scoring_pool.rank(snapshot, prediction_memo, selected_mask,
+                                                     k=request.k, offset=request.offset)
+            except Exception as e:
+                logging.error(f"Process-pool scoring failed, scoring in-process: {e}")
+        if top_movies is None:
+            top_movies = await run_in_threadpool(recommend_based_on_genres, selected_mask,
+                                                 k=request.k, offset=request.offset)
+
+    logging.info(f"Movie Recommendations: {top_movies}")
+    response = transform_recommendations(top_movies)
+    response["model_version"] = model_version
+    if top_movies:
+        result_cache.put(cache_key, response)
     return response
 
+@app.post("/recommend_batch")
+async def recommend_batch(request: BatchMovieIdsRequest):
+    """Top-k recommendations for many users in one pass over the catalog.
+
+    Each entry of `movieIds` is ranked exactly as /recommend would rank it;
+    users whose movies cannot be resolved get an empty list.
+    """
+    if not model_manager.ready:
+        raise HTTPException(status_code=503, detail="Rating model is still loading")
+
+    try:
+        selections = await fetch_selected_movies_batch(request.movieIds)
+        snapshot = await run_in_threadpool(catalog.get)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching movie details: {e}")
+
+    selected_masks = [process_movies(selected) for selected in selections]
+    model_version = prediction_memo.model_version
+    try:
+        ranked = await run_in_threadpool(rank_movies_batch, snapshot.movies, snapshot.genre_masks,
+                                         selected_masks, prediction_memo.predict_masks, k=request.k)
+    except Exception as e:
+        logging.error(f"Error scoring batch: {e}")
+        raise HTTPException(status_code=500, detail="Error scoring recommendations")
+
+    return {
+        "results": [
+            transform_recommendations(movies if selections[u] else [])["recommendations"]
+            for u, movies in enumerate(ranked)
+        ],
+        "model_version": model_version
+    }
+
 @app.post('/similar')
 async def similar(request: SimilarRequest):
-    similars = fetch_movie_data(genres=request.genres, cast=request.cast)
+    try:
+        snapshot = await run_in_threadpool(catalog.get)
+        similars = await run_in_threadpool(similar_from_catalog, snapshot, request.genres, request.cast,
+                                           request.title, request.limit)
+        if similars is not None:
+            return similars
+    except Exception as e:
+        logging.error(f"Error answering /similar from the catalog, falling back to Express: {e}")
+
+    similars = await fetch_movie_data(genres=request.genres, cast=request.cast)
     if not similars:
         raise HTTPException(status_code=500, detail="Error fetching similar movies")
 
@@ -273,51 +583,147 @@ async def similar(request: SimilarRequest):
     return filtered_recommendations
 
 
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def stream_cached_answer(http_request: Request, entry) -> StreamingResponse:
+    cache_info = cached_answer_response(entry)["cache"]
+    return sse_response(sse_answer_events(http_request, entry.sources, iter([entry.answer]),
+                                          done_extra={"cache": cache_info}))
+
+def adk_generation_limits(result):
+    """sse_answer_events arguments that hold streamed ADK generation to its stage budget."""
+    from adk.orchestrator import GENERATION_STAGE_TIMEOUT_SECONDS, stage_executor
+    return {"stages": result["stages"], "timeout": GENERATION_STAGE_TIMEOUT_SECONDS,
+            "executor": stage_executor("generation")}
+
+def store_answer_when_done(cache, question, scope, sources, started):
+    def on_complete(answer):
+        if is_cacheable_answer(answer):
+            cache.store(question, scope, answer, sources, (time.perf_counter() - started) * 1000)
+    return on_complete
+
 @app.post('/search')
-def search_endpoint(request: QueryRequest):
-    """Perform a RAG-style search using the Chroma store and Ollama embeddings/LLM.
+async def search_endpoint(request: QueryRequest, http_request: Request):
+    """Perform a RAG-style search using the vector store and Ollama embeddings/LLM.
 
-    Returns a JSON object with a `response` field containing the model's answer.
+    Returns a JSON object with a `response` field containing the model's answer,
+    or an SSE stream when `stream` is set.
     """
-        # Prefer the Python ADK orchestrator (Gemini-based) when available.
+    scope = ("search", index_version(INDEX_PATH))
+    cached = await run_in_threadpool(search_answers.lookup, request.query_text, scope)
+    if cached is not None:
+        return stream_cached_answer(http_request, cached) if request.stream else cached_answer_response(cached)
+
+    started = time.perf_counter()
+    # Prefer the Python ADK orchestrator (Gemini-based) when available.
+    try:
+        from adk.orchestrator import arun_multi_agent, astream_multi_agent
+        if request.stream:
+            result, tokens = await astream_multi_agent(request.query_text, executor=rerank_executor())
+            sources = result.get('reranked', [])[:5]
+            on_complete = None if result.get('partial') else \
+                store_answer_when_done(search_answers, request.query_text, scope, sources, started)
+            return sse_response(sse_answer_events(http_request, sources, tokens, on_complete=on_complete,
+                                                  **adk_generation_limits(result)))
+
+        result = await arun_multi_agent(request.query_text, executor=rerank_executor())
+        response = result.get('response')
+        sources = result.get('reranked', [])[:5]
+        # Answers built from partial retrieval are returned but not cached.
+        if is_cacheable_answer(response) and not result.get('partial'):
+            await run_in_threadpool(search_answers.store, request.query_text, scope, response, sources,
+                                    (time.perf_counter() - started) * 1000)
+        return {"response": response, "sources": sources, "adk": result}
+    except Exception:
+        # Fall back to legacy query_rag (may use Ollama) if orchestrator isn't available
         try:
-            from .adk.orchestrator import run_multi_agent
-            result = run_multi_agent(request.query_text)
-            return {"response": result.get('response'), "adk": result}
-        except Exception:
-            # Fall back to legacy query_rag (may use Ollama) if orchestrator isn't available
-            try:
-                response = query_rag(request.query_text)
-                return {"response": response}
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=str(e))
+            if request.stream:
+                sources, tokens = await run_in_threadpool(stream_rag, request.query_text)
+                return sse_response(sse_answer_events(http_request, sources, tokens))
+            response = await run_in_threadpool(query_rag, request.query_text)
+            return {"response": response}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post('/adk_query')
-def adk_query(request: QueryRequest):
+async def adk_query(request: QueryRequest, http_request: Request):
     """Run the Python multi-agent ADK pipeline and return a structured response.
 
-    This endpoint orchestrates intent classification, hybrid retrieval (semantic + lexical),
-    reranking, and generation.
+    This endpoint orchestrates intent classification, hybrid retrieval (semantic and
+    lexical, concurrently), reranking, and generation; `stages` reports how each ran.
+    With `stream`, the structured retrieval output is sent as the `sources` event and
+    the response follows as tokens.
     """
     try:
-        from .adk.orchestrator import run_multi_agent
+        from adk.orchestrator import arun_multi_agent, astream_multi_agent
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ADK import error: {e}")
 
     try:
-        result = run_multi_agent(request.query_text)
+        if request.stream:
+            result, tokens = await astream_multi_agent(request.query_text, executor=rerank_executor())
+            return sse_response(sse_answer_events(http_request, result, tokens, **adk_generation_limits(result)))
+        result = await arun_multi_agent(request.query_text, executor=rerank_executor())
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat")
-def chat_endpoint(request: QueryRequest):
+def chat_endpoint(request: QueryRequest, http_request: Request):
+    scope = ("chat", index_version(INDEX_PATH))
+    cached = chat_answers.lookup(request.query_text, scope)
+    if cached is not None:
+        return stream_cached_answer(http_request, cached) if request.stream else cached_answer_response(cached)
+
+    started = time.perf_counter()
+    try:
+        if request.stream:
+            sources, tokens = stream_rag(request.query_text)
+            return sse_response(sse_answer_events(
+                http_request, sources, tokens,
+                on_complete=store_answer_when_done(chat_answers, request.query_text, scope, sources, started)))
+        response, sources = query_rag_with_sources(request.query_text)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if is_cacheable_answer(response):
+        chat_answers.store(request.query_text, scope, response, sources, (time.perf_counter() - started) * 1000)
+    return {"response": response, "sources": sources}
+
+@app.post('/admin/refresh-catalog')
+def refresh_catalog():
     try:
-        response = query_rag(request.query_text)
-        return {"response": response}    
+        catalog.refresh()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))    
+        raise HTTPException(status_code=500, detail=f"Catalog refresh failed: {e}")
+    return catalog.stats()
+
+@app.get('/admin/stats')
+def admin_stats():
+    return {
+        "catalog": catalog.stats(),
+        "model": model_manager.stats(),
+        "prediction_memo": prediction_memo.stats(),
+        "predict_batcher": predict_batcher.stats() if predict_batcher else None,
+        "result_cache": result_cache.stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "answer_cache": {"chat": chat_answers.stats(), "search": search_answers.stats()},
+        "shadow": shadow_scorer.stats()
+    }
+
+@app.get('/health')
+def health():
+    """Readiness of the rating model, catalog and long-lived clients; 503 until all are up."""
+    body = {
+        "model": model_manager.ready,
+        "catalog": catalog.current is not None,
+        "resources": registry.health(),
+    }
+    ready = body["model"] and body["catalog"] and registry.ready()
+    body["status"] = "ok" if ready else "degraded"
+    return JSONResponse(body, status_code=200 if ready else 503)
 
 @app.get('/')
 def read_root():
@@ -12,7 +12,7 @@ except Exception:
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
-from langchain_community.vectorstores import Chroma
+from adk.vector_store import VECTOR_STORE_PATH, open_vector_store
 from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain_community.document_loaders import PyPDFDirectoryLoader
 
@@ -96,10 +96,8 @@ def calculate_chunk_ids(chunks):
     return chunks
 
 def add_to_chroma(chunks: list[Document]):
-    # Load the existing database.
-    db = Chroma(
-        persist_directory=CHROMA_PATH, embedding_function=get_embedding_function()
-    )
+    # Load the existing database (Chroma, or the local vector store with VECTOR_BACKEND=local).
+    db = open_vector_store(get_embedding_function(), CHROMA_PATH)
 
     # Calculate Page IDs.
     chunks_with_ids = calculate_chunk_ids(chunks)
@@ -126,8 +124,9 @@ def add_to_chroma(chunks: list[Document]):
 
 
 def clear_database():
-    if os.path.exists(CHROMA_PATH):
-        shutil.rmtree(CHROMA_PATH)
+    for path in (CHROMA_PATH, VECTOR_STORE_PATH):
+        if os.path.exists(path):
+            shutil.rmtree(path)
 
 def main():
     # Check if the database should be cleared (using the --clear flag).
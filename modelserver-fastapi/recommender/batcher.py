@@ -0,0 +1,159 @@
+import bisect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket `<=b` counts observations in (previous bound, b]."""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            labels = [f"<={b:g}" for b in self.bounds] + ["+Inf"]
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 3) if self.count else 0.0,
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class _Pending:
+    __slots__ = ("features", "future", "enqueued")
+
+    def __init__(self, features: np.ndarray):
+        self.features = features
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class PredictBatcher:
+    """Coalesces concurrent `predict` calls into one call on a stacked matrix.
+
+    Callers block in `predict()` while a worker thread collects feature rows
+    from every caller for up to `max_wait_ms` (or until `max_batch_rows` rows
+    are queued), runs the wrapped `predict` once on the stacked matrix and
+    scatters the slices back. Queue-wait and batch-size histograms are kept
+    for /admin/stats.
+
+    Once closed, `predict()` calls the wrapped `predict` directly, so callers
+    still holding a reference to a retired batcher are never left waiting.
+    """
+
+    def __init__(self, predict: Callable, max_batch_rows: int = 4096, max_wait_ms: float = 2.0,
+                 result_timeout: float = 30.0):
+        self._predict = predict
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.result_timeout = result_timeout
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._state_lock = threading.Lock()
+        self.queue_wait_ms = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100])
+        self.batch_rows = Histogram([1, 8, 32, 128, 512, 2048, 8192])
+        self.batch_requests = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        pending = _Pending(np.asarray(features))
+        with self._state_lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put(pending)
+        if not queued:
+            return np.asarray(self._predict(pending.features)).reshape(-1)
+        return pending.future.result(timeout=self.result_timeout)
+
+    def close(self):
+        """Stop the worker after the requests already queued have been served."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            # Nothing can be queued after close(), but never strand a caller.
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is not None and not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Predict batcher is closed"))
+
+    def _serve(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            rows = first.features.shape[0]
+            deadline = first.enqueued + self.max_wait
+            while rows < self.max_batch_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                rows += pending.features.shape[0]
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        for pending in batch:
+            self.queue_wait_ms.observe((started - pending.enqueued) * 1000)
+        self.batch_requests.observe(len(batch))
+
+        try:
+            stacked = np.vstack([pending.features for pending in batch])
+            self.batch_rows.observe(stacked.shape[0])
+            predicted = np.asarray(self._predict(stacked)).reshape(-1)
+        except Exception as e:
+            logging.error(f"Batched predict failed for {len(batch)} requests: {e}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        offset = 0
+        for pending in batch:
+            size = pending.features.shape[0]
+            pending.future.set_result(predicted[offset:offset + size])
+            offset += size
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_rows": self.max_batch_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_wait_ms": self.queue_wait_ms.stats(),
+            "batch_rows": self.batch_rows.stats(),
+            "batch_requests": self.batch_requests.stats(),
+        }
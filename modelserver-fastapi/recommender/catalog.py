@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .genres import build_genre_masks
+from .index import CastIndex, GenreIndex
+
+
+class CatalogSnapshot:
+    """Immutable view of the movie catalog prepared for scoring.
+
+    Holds the parsed movies, their packed uint32 genre masks, an `_id` -> row
+    index and genre and cast inverted indexes. A snapshot is never mutated after
+    construction; refreshes build a new one and swap it in.
+    """
+
+    def __init__(self, movies: List[Dict], version: int):
+        self.movies = movies
+        self.genre_masks = build_genre_masks(movies)
+        self.genre_masks.setflags(write=False)
+        self.genre_index = GenreIndex(self.genre_masks)
+        self.cast_index = CastIndex(movies)
+        self.id_index = {str(m['_id']): row for row, m in enumerate(movies) if m.get('_id') is not None}
+        self.version = version
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.movies)
+
+    def lookup(self, movie_ids: List[str]) -> List[Dict]:
+        """Return the catalog movies for the given ids, skipping unknown ids."""
+        return [self.movies[self.id_index[i]] for i in movie_ids if i in self.id_index]
+
+    def rows(self, movie_ids: List[str]) -> np.ndarray:
+        return np.array([self.id_index[i] for i in movie_ids if i in self.id_index], dtype=np.int64)
+
+
+class CatalogCache:
+    """In-process catalog cache refreshed on a TTL or on demand.
+
+    The first `get()` loads synchronously. Afterwards an expired snapshot is
+    still served while a background thread fetches the replacement, so catalog
+    transfer and parsing stay off the request path. Readers always see either
+    the old or the new snapshot, never a partially built one.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict]], ttl_seconds: float = 300):
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+
+    def add_listener(self, callback: Callable[[CatalogSnapshot], None]):
+        """Register a callback invoked with every newly installed snapshot."""
+        self._listeners.append(callback)
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        """The installed snapshot, or None; never triggers a load."""
+        return self._snapshot
+
+    def is_stale(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot is None or (time.time() - snapshot.loaded_at) > self.ttl_seconds
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if self.is_stale() and not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_quietly, daemon=True).start()
+        return snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        """Fetch and install a new snapshot, returning it.
+
+        Concurrent callers wait for the refresh already in flight instead of
+        issuing their own fetch.
+        """
+        started = time.time()
+        with self._refresh_lock:
+            current = self._snapshot
+            if current is not None and current.loaded_at >= started:
+                return current
+
+            movies = self._fetch()
+            snapshot = CatalogSnapshot(movies, self._version + 1)
+            self._version = snapshot.version
+            self._snapshot = snapshot
+
+        self._notify(snapshot)
+        return snapshot
+
+    def _notify(self, snapshot: CatalogSnapshot):
+        logging.info(f"Catalog snapshot v{snapshot.version} loaded: {len(snapshot)} movies")
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.error(f"Catalog listener failed: {e}")
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error(f"Background catalog refresh failed: {e}")
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else 0,
+            "movies": len(snapshot) if snapshot else 0,
+            "age_seconds": round(time.time() - snapshot.loaded_at, 3) if snapshot else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# Column order of the one-hot genre features the MLflow models were trained on.
+GENRE_NAMES = [
+    'Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime',
+    'Documentary', 'Drama', 'Family', 'Fantasy', 'FilmNoir', 'History',
+    'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'SciFi', 'Short',
+    'Sport', 'Thriller', 'War', 'Western'
+]
+NUM_GENRES = len(GENRE_NAMES)
+GENRE_INDICES = {genre: i for i, genre in enumerate(GENRE_NAMES)}
+
+# Bit i of a packed genre mask is set when the movie has GENRE_NAMES[i].
+GENRE_BITS = (1 << np.arange(NUM_GENRES, dtype=np.int64))
+
+# Popcount of every byte value, used when numpy lacks bitwise_count (< 2.0).
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def genre_names_to_mask(genres: Iterable[str]) -> int:
+    """Pack a list of genre names into a 23-bit mask, ignoring unknown genres."""
+    mask = 0
+    for genre in genres or []:
+        bit = GENRE_INDICES.get(genre)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_genre_names(mask: int) -> List[str]:
+    return [genre for i, genre in enumerate(GENRE_NAMES) if mask >> i & 1]
+
+
+def build_genre_masks(movies: List[Dict]) -> np.ndarray:
+    """Encode the genres of every movie as a contiguous uint32 bitmask array."""
+    return np.fromiter((genre_names_to_mask(m.get('genres')) for m in movies),
+                       dtype=np.uint32, count=len(movies))
+
+
+def pack_genre_rows(matrix: np.ndarray) -> np.ndarray:
+    """Pack each one-hot genre row into a single uint32 bitmask."""
+    return (np.asarray(matrix, dtype=np.int64) @ GENRE_BITS).astype(np.uint32)
+
+
+def unpack_genre_masks(masks: np.ndarray) -> np.ndarray:
+    """Inverse of `pack_genre_rows`: expand bitmasks to the (N, 23) int64 rows the models expect."""
+    masks = np.asarray(masks, dtype=np.int64).reshape(-1, 1)
+    return ((masks & GENRE_BITS) != 0).astype(np.int64)
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """Number of set bits in every element of a uint32 array."""
+    masks = np.ascontiguousarray(masks, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int64)
+    counts = _BYTE_POPCOUNT[masks.view(np.uint8)].reshape(masks.shape + (4,))
+    return counts.sum(axis=-1, dtype=np.int64)
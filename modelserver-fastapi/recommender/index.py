@@ -0,0 +1,75 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .genres import NUM_GENRES
+
+
+class GenreIndex:
+    """Inverted index from genre bit to the sorted catalog rows carrying it."""
+
+    def __init__(self, genre_masks: np.ndarray):
+        masks = np.asarray(genre_masks, dtype=np.uint32)
+        self.num_rows = masks.shape[0]
+        self.postings: List[np.ndarray] = [
+            np.flatnonzero(masks & np.uint32(1 << bit)) for bit in range(NUM_GENRES)
+        ]
+
+    @classmethod
+    def from_postings(cls, flat: np.ndarray, offsets: np.ndarray, num_rows: int) -> "GenreIndex":
+        """Rebuild an index from concatenated postings (e.g. memory-mapped) without copying them."""
+        index = cls.__new__(cls)
+        index.num_rows = num_rows
+        index.postings = [flat[offsets[bit]:offsets[bit + 1]] for bit in range(NUM_GENRES)]
+        return index
+
+    def flatten(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenated postings plus the offsets that delimit each genre."""
+        offsets = np.zeros(NUM_GENRES + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([p.size for p in self.postings])
+        return np.concatenate(self.postings).astype(np.int64), offsets
+
+    def lookup(self, selected_mask: int) -> List[np.ndarray]:
+        return [self.postings[bit] for bit in range(NUM_GENRES) if selected_mask >> bit & 1]
+
+    def candidates(self, selected_mask: int) -> np.ndarray:
+        """Sorted rows sharing at least one genre with `selected_mask`.
+
+        Every other row has cosine similarity 0 and cannot outrank these.
+        """
+        lists = self.lookup(selected_mask)
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+
+class CastIndex:
+    """Inverted index from cast member name to the sorted catalog rows they appear in."""
+
+    def __init__(self, movies: List[Dict]):
+        postings: Dict[str, List[int]] = {}
+        for row, movie in enumerate(movies):
+            cast = movie.get('cast') or []
+            if not isinstance(cast, list):
+                continue
+            for name in set(cast):
+                postings.setdefault(name, []).append(row)
+        self.postings = {name: np.array(rows, dtype=np.int64) for name, rows in postings.items()}
+
+    def lookup(self, names: List[str]) -> List[np.ndarray]:
+        return [self.postings[name] for name in set(names or []) if name in self.postings]
+
+
+def rank_by_overlap(postings: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge postings lists and rank rows by how many lists contain them.
+
+    Returns (rows, counts) ordered by overlap count descending, then row.
+    """
+    if not postings:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+    order = np.lexsort((rows, -counts))
+    return rows[order], counts[order]
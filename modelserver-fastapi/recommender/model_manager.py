@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ModelManager:
+    """Loads the rating model from the MLflow registry in the background.
+
+    The manager polls the registry for the version currently behind a stage
+    (e.g. "Production"), an alias (e.g. "champion") or a pinned version. When
+    that version changes it loads the new pyfunc model, runs the registered
+    swap listeners (which warm caches against the new model), and only then
+    makes it the active model. Requests keep using the previous model until
+    the swap, so serving never waits on MLflow.
+    """
+
+    def __init__(self, model_name: str, version: Optional[str] = None, stage: Optional[str] = None,
+                 alias: Optional[str] = None, poll_seconds: float = 60):
+        self.model_name = model_name
+        self.pinned_version = str(version) if version is not None else None
+        self.stage = stage
+        self.alias = alias
+        self.poll_seconds = poll_seconds
+        self._active = None  # (version, model), replaced as a whole on swap
+        self._listeners: List[Callable] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+
+    def add_listener(self, callback: Callable):
+        """Register `callback(model, version)`, run after loading and before the swap."""
+        self._listeners.append(callback)
+
+    @property
+    def ready(self) -> bool:
+        return self._active is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        active = self._active
+        return active[0] if active else None
+
+    @property
+    def model(self):
+        active = self._active
+        return active[1] if active else None
+
+    def resolve_version(self) -> str:
+        """Ask the registry which version should be serving right now."""
+        if self.pinned_version is not None:
+            return self.pinned_version
+
+        from mlflow.tracking import MlflowClient
+        client = MlflowClient()
+        if self.alias:
+            return str(client.get_model_version_by_alias(self.model_name, self.alias).version)
+        versions = client.get_latest_versions(self.model_name, stages=[self.stage] if self.stage else None)
+        if not versions:
+            raise LookupError(f"No registered versions of {self.model_name} for stage {self.stage!r}")
+        return str(max(int(v.version) for v in versions))
+
+    def check_for_update(self) -> bool:
+        """Load and activate the registry's current version if it is new. Returns True on swap."""
+        import mlflow.pyfunc
+
+        self.last_checked = time.time()
+        version = self.resolve_version()
+        if version == self.version:
+            return False
+
+        started = time.time()
+        model = mlflow.pyfunc.load_model(model_uri=f"models:/{self.model_name}/{version}")
+        for callback in self._listeners:
+            callback(model, version)
+        self._active = (version, model)
+        logging.info(f"Activated {self.model_name} v{version} in {time.time() - started:.1f}s")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_for_update()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Model registry poll failed for {self.model_name}: {e}")
+            # Retry quickly until the first model is up, then poll at the normal pace.
+            self._stop.wait(self.poll_seconds if self.ready else min(self.poll_seconds, 5))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-manager", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        return {
+            "model_name": self.model_name,
+            "active_version": self.version,
+            "stage": self.stage,
+            "alias": self.alias,
+            "pinned_version": self.pinned_version,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .genres import pack_genre_rows, unpack_genre_masks
+
+
+class PredictionMemo:
+    """Memoizes model rating predictions keyed by packed genre bitmask.
+
+    The rating models only see the 23 genre bits, so the whole catalog maps
+    onto a few hundred distinct inputs. Each distinct mask is predicted once
+    per model version; everything after that is a table lookup. Hits and
+    misses are counted per distinct mask looked up.
+    """
+
+    def __init__(self, predict: Optional[Callable] = None, model_version=None):
+        self._predict = predict
+        self.model_version = model_version
+        self._table: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set_model(self, predict: Callable, model_version, warm_masks: Optional[np.ndarray] = None):
+        """Point the memo at a new model, dropping cached ratings if the version changed.
+
+        With `warm_masks`, ratings for the new version are computed before the
+        swap, so requests keep hitting the old table until the new one is full.
+        """
+        table = None
+        if model_version != self.model_version:
+            table = {}
+            if warm_masks is not None:
+                masks = np.unique(np.asarray(warm_masks, dtype=np.uint32))
+                masks = masks[masks != 0]
+                if masks.size:
+                    predicted = np.asarray(predict(unpack_genre_masks(masks)), dtype=np.float64).reshape(-1)
+                    table = dict(zip(masks.tolist(), predicted.tolist()))
+
+        with self._lock:
+            if table is not None:
+                self._table = table
+                logging.info(f"Prediction memo switched to model version {model_version} ({len(table)} masks warm)")
+            self._predict = predict
+            self.model_version = model_version
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Drop-in replacement for `model.predict` on (N, 23) genre rows."""
+        return self.predict_masks(pack_genre_rows(features))
+
+    def predict_masks(self, masks: np.ndarray) -> np.ndarray:
+        """Predicted rating for every packed genre mask."""
+        unique, inverse = np.unique(masks, return_inverse=True)
+        keys = unique.tolist()
+
+        with self._lock:
+            table, predict = self._table, self._predict
+        missing = [m for m in keys if m not in table]
+        fresh = {}
+        if missing and predict is None:
+            raise RuntimeError("No rating model loaded yet")
+        if missing:
+            predicted = predict(unpack_genre_masks(np.array(missing, dtype=np.uint32)))
+            fresh = dict(zip(missing, np.asarray(predicted, dtype=np.float64).reshape(-1).tolist()))
+
+        with self._lock:
+            # Skip the write if set_model swapped tables while we predicted.
+            if fresh and self._table is table:
+                table.update(fresh)
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        values = np.array([fresh[m] if m in fresh else table[m] for m in keys], dtype=np.float64)
+        return values[inverse.reshape(-1)]
+
+    def warm(self, masks: np.ndarray):
+        """Predict every distinct non-empty genre mask ahead of traffic."""
+        if self._predict is None:
+            return
+        masks = np.asarray(masks, dtype=np.uint32)
+        masks = masks[masks != 0]
+        if masks.size:
+            self.predict_masks(masks)
+        logging.info(f"Prediction memo warmed: {len(self._table)} distinct genre masks")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._table),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .scoring import mask_cosine_similarity, rank_scored, top_k_indices
+from .shared_arrays import load_arrays, publish_arrays, remove_arrays
+
+# Worker-side cache of the memory-mapped catalog arrays, keyed by path.
+_attached: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def _catalog_arrays(path: str) -> Dict[str, np.ndarray]:
+    arrays = _attached.get(path)
+    if arrays is None:
+        _attached.clear()
+        arrays = _attached[path] = load_arrays(path)
+    return arrays
+
+
+def score_page(path: str, selected_mask: int, k: int, offset: int) -> Tuple[np.ndarray, ...]:
+    """Runs in a pool worker: score the published catalog and return one page.
+
+    Only the selection goes in and only the page's rows and scores come back;
+    the catalog itself is memory-mapped from `path`, never pickled.
+    """
+    arrays = _catalog_arrays(path)
+    masks, ratings = arrays['genre_masks'], arrays['ratings']
+
+    # Same pruning as the in-process path: only overlapping rows can score above
+    # zero, unless there are too few of them to fill the page.
+    rows = np.flatnonzero(masks & np.uint32(selected_mask))
+    if rows.size < offset + k:
+        rows = np.flatnonzero(masks)
+
+    predicted = np.asarray(ratings[rows], dtype=np.float64)
+    similarity = mask_cosine_similarity(masks[rows], selected_mask)
+    combined = predicted * similarity
+    order = top_k_indices(combined, offset + k)[offset:]
+    return rows[order], predicted[order], similarity[order], combined[order]
+
+
+class ScoringPool:
+    """Runs CPU-bound scoring in worker processes so the event loop stays free.
+
+    For each (catalog version, model version) the parent writes the genre masks
+    and per-row predicted ratings once as memory-mapped .npy files; workers map
+    them on first use and keep them until a newer generation appears. The
+    underlying executor is also exposed for other CPU-bound stages (e.g. ADK
+    reranking).
+    """
+
+    def __init__(self, processes: int, directory: Optional[str] = None):
+        self.executor = ProcessPoolExecutor(max_workers=processes,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self.processes = processes
+        self.directory = directory or tempfile.mkdtemp(prefix='recommender-catalog-')
+        self._published_key = None
+        self._paths: List[str] = []
+        self._lock = threading.Lock()
+
+    def publish(self, snapshot, prediction_memo) -> str:
+        """Publish arrays for the current catalog and model, reusing them if unchanged."""
+        key = (snapshot.version, prediction_memo.model_version)
+        with self._lock:
+            if key == self._published_key:
+                return self._paths[-1]
+
+            masks = np.asarray(snapshot.genre_masks)
+            ratings = np.zeros(masks.shape[0], dtype=np.float64)
+            rows = np.flatnonzero(masks)
+            if rows.size:
+                ratings[rows] = prediction_memo.predict_masks(masks[rows])
+
+            path = publish_arrays(self.directory, f"catalog-v{key[0]}-m{key[1]}",
+                                  {'genre_masks': masks, 'ratings': ratings})
+            self._paths.append(path)
+            self._published_key = key
+            # Keep the previous generation for requests already queued against it.
+            while len(self._paths) > 2:
+                remove_arrays(self._paths.pop(0))
+            logging.info(f"Published catalog arrays for scoring workers: {path}")
+            return path
+
+    async def rank(self, snapshot, prediction_memo, selected_mask: int, k: int, offset: int = 0) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(None, self.publish, snapshot, prediction_memo)
+        rows, predicted, similarity, combined = await loop.run_in_executor(
+            self.executor, score_page, path, selected_mask, k, offset)
+        return rank_scored(snapshot.movies, rows, predicted, similarity, combined)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        remove_arrays(self.directory)
@@ -0,0 +1,145 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .genres import popcount
+
+
+def mask_cosine_similarity(masks: np.ndarray, selected_mask: int) -> np.ndarray:
+    """Cosine similarity of every genre bitmask against `selected_mask`.
+
+    For binary vectors cos(a, b) = |a & b| / sqrt(|a| * |b|), so the whole
+    computation is popcounts over the packed masks plus one division at the
+    end. Empty masks, or an empty selection, score 0.0.
+    """
+    masks = np.asarray(masks, dtype=np.uint32)
+    selected_bits = int(popcount(np.array([selected_mask], dtype=np.uint32))[0])
+    if masks.size == 0 or selected_bits == 0:
+        return np.zeros(masks.shape, dtype=np.float64)
+
+    shared = popcount(masks & np.uint32(selected_mask))
+    norms = popcount(masks) * selected_bits
+    norms[norms == 0] = 1
+    return shared / np.sqrt(norms)
+
+
+def score_catalog(genre_masks: np.ndarray, selected_mask: int, predict_masks: Callable,
+                  rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Score catalog rows against the selected genres in one pass.
+
+    `rows` restricts scoring to a candidate subset (default: the whole
+    catalog). Rows without any genre are dropped, the remaining masks go
+    through a single `predict_masks` call, and the combined score is
+    `predicted_rating * similarity`. Returns (rows, predicted, similarity,
+    combined) aligned with each other.
+    """
+    if rows is None:
+        rows = np.flatnonzero(genre_masks)
+    else:
+        rows = rows[genre_masks[rows] != 0]
+    if rows.size == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return rows, empty, empty, empty
+
+    masks = genre_masks[rows]
+    predicted = np.asarray(predict_masks(masks), dtype=np.float64).reshape(-1)
+    similarity = mask_cosine_similarity(masks, selected_mask)
+    return rows, predicted, similarity, predicted * similarity
+
+
+def _ranked_movie(movie: Dict, predicted: float, similarity: float, combined: float) -> Dict:
+    return {
+        "title": movie.get("title", "Unknown"),
+        "genres": movie.get("genres", []),
+        "cast": movie.get("cast", []),
+        "predicted_rating": float(predicted),
+        "genre_similarity": float(similarity),
+        "combined_score": float(combined)
+    }
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first, in O(N).
+
+    Uses `argpartition` instead of a full sort. Ties are broken by lower
+    index, so the result equals the first `k` entries of a stable descending
+    sort.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - above.size]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
+
+
+def rank_movies(movies: List[Dict], genre_masks: np.ndarray, selected_mask: int,
+                predict_masks: Callable, rows: Optional[np.ndarray] = None,
+                k: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """Return scorable movies sorted by combined score, highest first.
+
+    `rows` limits ranking to a candidate subset, as in `score_catalog`. With
+    `k`, only the page `[offset, offset + k)` of the ranking is selected and
+    materialized. Ties keep catalog order, matching the stable sort of the
+    per-movie loop this replaces.
+    """
+    rows, predicted, similarity, combined = score_catalog(genre_masks, selected_mask, predict_masks, rows)
+    return rank_scored(movies, rows, predicted, similarity, combined, k=k, offset=offset)
+
+
+def rank_scored(movies: List[Dict], rows: np.ndarray, predicted: np.ndarray, similarity: np.ndarray,
+                combined: np.ndarray, k: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """Order already-scored rows by combined score and materialize one page.
+
+    `rows` must be ascending so ties fall back to catalog order.
+    """
+    if k is None:
+        order = np.argsort(-combined, kind='stable')[offset:]
+    else:
+        order = top_k_indices(combined, offset + k)[offset:]
+
+    return [_ranked_movie(movies[rows[i]], predicted[i], similarity[i], combined[i]) for i in order]
+
+
+def rank_movies_batch(movies: List[Dict], genre_masks: np.ndarray, selected_masks: List[int],
+                      predict_masks: Callable, k: int, offset: int = 0) -> List[List[Dict]]:
+    """Rank the catalog for many selections at once.
+
+    Ratings are predicted once per catalog row and shared by every user, and
+    catalog popcounts are computed once. Each distinct selection is then scored
+    with mask popcounts as in `rank_movies`, so working memory stays at a few
+    length-N vectors however many users are in the batch, and users with the
+    same selection share one ranked page. Returns one ranked page per entry of
+    `selected_masks`.
+    """
+    rows = np.flatnonzero(genre_masks)
+    if rows.size == 0 or not selected_masks:
+        return [[] for _ in selected_masks]
+
+    masks = np.asarray(genre_masks[rows], dtype=np.uint32)
+    predicted = np.asarray(predict_masks(masks), dtype=np.float64).reshape(-1)
+    catalog_bits = popcount(masks)
+
+    selected = np.asarray(selected_masks, dtype=np.uint32)
+    selected_bits = popcount(selected)
+    pages: Dict[int, List[Dict]] = {}
+    results = []
+    for selected_mask, bits in zip(selected.tolist(), selected_bits.tolist()):
+        if selected_mask not in pages:
+            if bits == 0:
+                similarity = np.zeros(rows.size, dtype=np.float64)
+            else:
+                norms = catalog_bits * bits
+                similarity = popcount(masks & np.uint32(selected_mask)) / np.sqrt(np.maximum(norms, 1))
+            combined = predicted * similarity
+            order = top_k_indices(combined, offset + k)[offset:]
+            pages[selected_mask] = [
+                _ranked_movie(movies[rows[i]], predicted[i], similarity[i], combined[i]) for i in order
+            ]
+        results.append(pages[selected_mask])
+    return results
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .genres import unpack_genre_masks
+from .model_manager import ModelManager
+from .scoring import mask_cosine_similarity, top_k_indices
+
+
+class ModelMetrics:
+    """Rolling latency and divergence numbers for one model."""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=window)
+        self.abs_diffs = deque(maxlen=window)
+        self.top_k_overlaps = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float, abs_diff: float = None, top_k_overlap: float = None):
+        with self._lock:
+            self.requests += 1
+            self.latencies_ms.append(latency_ms)
+            if abs_diff is not None:
+                self.abs_diffs.append(abs_diff)
+            if top_k_overlap is not None:
+                self.top_k_overlaps.append(top_k_overlap)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = np.array(self.latencies_ms, dtype=np.float64)
+            stats = {"requests": self.requests, "errors": self.errors}
+            if latencies.size:
+                stats.update({
+                    "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+                    "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+                    "latency_ms_max": round(float(latencies.max()), 3),
+                })
+            if self.abs_diffs:
+                stats["mean_abs_rating_diff"] = round(float(np.mean(self.abs_diffs)), 4)
+            if self.top_k_overlaps:
+                stats["mean_top_k_overlap"] = round(float(np.mean(self.top_k_overlaps)), 4)
+            return stats
+
+
+class ShadowScorer:
+    """Scores live /recommend candidates with shadow models off the request path.
+
+    The primary model's predictions answer the request. The same candidate
+    masks are queued to a small executor where the primary model and every
+    ready shadow model predict their distinct masks, and per-model latency plus
+    divergence from the primary (mean absolute rating difference and top-k
+    overlap of the combined score) are recorded. Latencies are therefore
+    measured on identical inputs. When the queue is full, work is dropped
+    rather than delaying requests.
+    """
+
+    def __init__(self, managers: Dict[str, ModelManager], primary: Optional[ModelManager] = None,
+                 max_workers: int = 1, max_pending: int = 32):
+        self.managers = managers
+        self.primary = primary
+        self.max_pending = max_pending
+        self.metrics: Dict[str, ModelMetrics] = {name: ModelMetrics() for name in managers}
+        self.primary_metrics = ModelMetrics()
+        self.dropped = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow") if managers else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.managers)
+
+    def wrap(self, predict_masks: Callable, selected_mask: int, k: int) -> Callable:
+        """Wrap the primary `predict_masks` so each call is shadowed."""
+        def predict_and_shadow(masks):
+            predicted = predict_masks(masks)
+            self.submit(masks, predicted, selected_mask, k)
+            return predicted
+        return predict_and_shadow
+
+    def submit(self, masks: np.ndarray, primary_predicted: np.ndarray, selected_mask: int, k: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending += 1
+        self._executor.submit(self._score, np.array(masks, copy=True),
+                              np.asarray(primary_predicted, dtype=np.float64), selected_mask, k)
+
+    @staticmethod
+    def _timed_predict(model, features: np.ndarray, inverse: np.ndarray):
+        """Predict the distinct masks once and scatter back to every candidate row."""
+        started = time.perf_counter()
+        predicted = np.asarray(model.predict(features), dtype=np.float64).reshape(-1)
+        return predicted[inverse], (time.perf_counter() - started) * 1000
+
+    def _score(self, masks, primary_predicted, selected_mask, k):
+        try:
+            unique, inverse = np.unique(masks, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            features = unpack_genre_masks(unique)
+            similarity = mask_cosine_similarity(masks, selected_mask)
+            primary_top = set(top_k_indices(primary_predicted * similarity, k).tolist())
+
+            primary_model = self.primary.model if self.primary is not None else None
+            if primary_model is not None:
+                try:
+                    self.primary_metrics.record(self._timed_predict(primary_model, features, inverse)[1])
+                except Exception as e:
+                    self.primary_metrics.record_error()
+                    logging.error(f"Primary model failed while shadowing: {e}")
+
+            for name, manager in self.managers.items():
+                model = manager.model
+                if model is None:
+                    continue
+                metrics = self.metrics[name]
+                try:
+                    predicted, latency_ms = self._timed_predict(model, features, inverse)
+                except Exception as e:
+                    metrics.record_error()
+                    logging.error(f"Shadow model {name} failed: {e}")
+                    continue
+
+                shadow_top = set(top_k_indices(predicted * similarity, k).tolist())
+                overlap = len(primary_top & shadow_top) / max(len(primary_top), 1)
+                metrics.record(latency_ms, float(np.mean(np.abs(predicted - primary_predicted))), overlap)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def start(self):
+        for manager in self.managers.values():
+            manager.start()
+
+    def stop(self):
+        for manager in self.managers.values():
+            manager.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict:
+        return {
+            "primary": self.primary_metrics.stats(),
+            "shadows": {
+                name: dict(self.metrics[name].stats(), version=manager.version)
+                for name, manager in self.managers.items()
+            },
+            "dropped": self.dropped,
+        }
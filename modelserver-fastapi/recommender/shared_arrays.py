@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+from typing import Dict
+
+import numpy as np
+
+
+def publish_arrays(directory: str, name: str, arrays: Dict[str, np.ndarray]) -> str:
+    """Write `arrays` as .npy files under `directory/name` and return that path.
+
+    Files are written to a temporary directory first and renamed into place, so
+    readers never observe a partially written generation.
+    """
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, name)
+    staging = tempfile.mkdtemp(prefix=f".{name}-", dir=directory)
+    for key, array in arrays.items():
+        np.save(os.path.join(staging, f"{key}.npy"), np.ascontiguousarray(array))
+    if os.path.exists(final_path):
+        shutil.rmtree(final_path, ignore_errors=True)
+    os.replace(staging, final_path)
+    return final_path
+
+
+def load_arrays(path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every array under `path` read-only; pages are shared by all readers."""
+    return {
+        entry[:-4]: np.load(os.path.join(path, entry), mmap_mode='r')
+        for entry in os.listdir(path) if entry.endswith('.npy')
+    }
+
+
+def remove_arrays(path: str):
+    shutil.rmtree(path, ignore_errors=True)
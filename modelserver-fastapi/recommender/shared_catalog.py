@@ -0,0 +1,294 @@
+"""Catalog snapshots shared across uvicorn worker processes.
+
+With several workers, one process (whichever holds `publisher.lock`) fetches
+the catalog and publishes it as memory-mapped arrays under
+`<directory>/gen-<n>/`, then bumps the `generation` file. Every worker,
+including the publisher, serves from those mappings: the genre masks, genre
+postings, sorted id table and the JSON-encoded movie documents live once in
+the page cache instead of once per process. Each worker runs a watcher thread
+that polls the directory: followers attach to new generations, and the
+publisher republishes when the TTL lapses or a follower files a refresh
+request. If the publisher exits, the next follower to poll takes over the lock.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .catalog import CatalogCache, CatalogSnapshot
+from .genres import build_genre_masks
+from .index import CastIndex, GenreIndex
+from .shared_arrays import load_arrays, publish_arrays, remove_arrays
+
+GENERATION_FILE = 'generation'
+LOCK_FILE = 'publisher.lock'
+REFRESH_REQUEST_FILE = 'refresh.request'
+
+
+def _generation_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"gen-{generation:08d}")
+
+
+def read_generation(directory: str) -> int:
+    try:
+        with open(os.path.join(directory, GENERATION_FILE)) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_generation(directory: str, generation: int):
+    path = os.path.join(directory, GENERATION_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(str(generation))
+    os.replace(tmp, path)
+
+
+def publish_catalog(directory: str, movies: List[Dict], generation: int) -> str:
+    """Encode `movies` into flat arrays and publish them as generation `generation`."""
+    encoded = [json.dumps(m, separators=(',', ':'), default=str).encode() for m in movies]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(doc) for doc in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    ids = np.array([str(m.get('_id', '')).encode() for m in movies] or [b''], dtype=np.bytes_)[:len(movies)]
+    id_rows = np.argsort(ids, kind='stable').astype(np.int64)
+
+    masks = build_genre_masks(movies)
+    postings, posting_offsets = GenreIndex(masks).flatten()
+
+    return publish_arrays(directory, os.path.basename(_generation_path(directory, generation)), {
+        'genre_masks': masks,
+        'genre_postings': postings,
+        'genre_offsets': posting_offsets,
+        'ids_sorted': ids[id_rows],
+        'id_rows': id_rows,
+        'movies_blob': blob,
+        'movies_offsets': offsets,
+    })
+
+
+class SharedMovies:
+    """Read-only sequence of movie dicts decoded on access from a mapped JSON blob."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return self._offsets.shape[0] - 1
+
+    def __getitem__(self, row) -> Dict:
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return json.loads(self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes())
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+class SortedIdIndex:
+    """`_id` -> row mapping over a sorted, memory-mapped id table (binary search)."""
+
+    def __init__(self, ids_sorted: np.ndarray, rows: np.ndarray):
+        self._ids = ids_sorted
+        self._rows = rows
+
+    def _find(self, movie_id: str) -> int:
+        key = np.array(str(movie_id).encode(), dtype=self._ids.dtype)
+        if key.tobytes().rstrip(b'\0') != str(movie_id).encode():
+            return -1  # longer than any stored id
+        pos = int(np.searchsorted(self._ids, key))
+        if pos < self._ids.shape[0] and self._ids[pos] == key:
+            return int(self._rows[pos])
+        return -1
+
+    def __contains__(self, movie_id) -> bool:
+        return self._find(movie_id) >= 0
+
+    def __getitem__(self, movie_id) -> int:
+        row = self._find(movie_id)
+        if row < 0:
+            raise KeyError(movie_id)
+        return row
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+
+class SharedCatalogSnapshot(CatalogSnapshot):
+    """A CatalogSnapshot whose arrays are memory-mapped from a published generation."""
+
+    def __init__(self, path: str, version: int):
+        arrays = load_arrays(path)
+        self.path = path
+        self.movies = SharedMovies(arrays['movies_blob'], arrays['movies_offsets'])
+        self.genre_masks = arrays['genre_masks']
+        self.genre_index = GenreIndex.from_postings(arrays['genre_postings'], arrays['genre_offsets'],
+                                                    self.genre_masks.shape[0])
+        self.id_index = SortedIdIndex(arrays['ids_sorted'], arrays['id_rows'])
+        self.version = version
+        self.loaded_at = time.time()
+        self._cast_index: Optional[CastIndex] = None
+        self._cast_lock = threading.Lock()
+
+    @property
+    def cast_index(self) -> CastIndex:
+        # Only /similar needs it, so each worker builds it on first use.
+        if self._cast_index is None:
+            with self._cast_lock:
+                if self._cast_index is None:
+                    self._cast_index = CastIndex(self.movies)
+        return self._cast_index
+
+
+class SharedCatalog(CatalogCache):
+    """CatalogCache that shares one published snapshot between worker processes.
+
+    Exposes the same `get`/`refresh`/`current`/`add_listener`/`stats` interface,
+    with snapshot versions equal to the shared generation number, so version
+    keyed caches agree across workers.
+    """
+
+    def __init__(self, directory: str, fetch: Callable[[], List[Dict]], ttl_seconds: float = 300,
+                 poll_seconds: float = 2, wait_seconds: float = 60):
+        super().__init__(fetch, ttl_seconds=ttl_seconds)
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.wait_seconds = wait_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd: Optional[int] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_lock = threading.Lock()
+
+    @property
+    def is_publisher(self) -> bool:
+        return self._lock_fd is not None
+
+    def _try_become_publisher(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        import fcntl  # POSIX only; imported here so the module loads everywhere
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logging.info(f"Worker {os.getpid()} is now the shared catalog publisher")
+        return True
+
+    def _mtime(self, name: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            return 0.0
+
+    def _publish_due(self) -> bool:
+        """Whether the published generation has outlived the TTL or a refresh was
+        requested after it; judged from the shared files, not this process's history."""
+        published_at = self._mtime(GENERATION_FILE)
+        return time.time() - published_at > self.ttl_seconds or self._mtime(REFRESH_REQUEST_FILE) > published_at
+
+    def _attach(self, generation: int) -> CatalogSnapshot:
+        snapshot = SharedCatalogSnapshot(_generation_path(self.directory, generation), generation)
+        self._snapshot = snapshot
+        self._notify(snapshot)
+        return snapshot
+
+    def _attach_latest(self) -> Optional[CatalogSnapshot]:
+        generation = read_generation(self.directory)
+        current = self._snapshot
+        if generation and (current is None or current.version != generation):
+            return self._attach(generation)
+        return current
+
+    def _publish(self) -> CatalogSnapshot:
+        movies = self._fetch()
+        generation = read_generation(self.directory) + 1
+        publish_catalog(self.directory, movies, generation)
+        _write_generation(self.directory, generation)
+        # Keep the previous generation for workers that have not re-attached yet.
+        for stale in range(max(generation - 2, 0), 0, -1):
+            path = _generation_path(self.directory, stale)
+            if not os.path.exists(path):
+                break
+            remove_arrays(path)
+        logging.info(f"Published shared catalog generation {generation}: {len(movies)} movies")
+        return self._attach(generation)
+
+    def _ensure_watcher(self):
+        if self._watcher is None:
+            with self._watcher_lock:
+                if self._watcher is None:
+                    self._watcher = threading.Thread(target=self._watch, name="shared-catalog-watch", daemon=True)
+                    self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            # Skip the tick while a refresh() is publishing or attaching.
+            if not self._refresh_lock.acquire(blocking=False):
+                continue
+            try:
+                if self._try_become_publisher() and self._publish_due():
+                    self._publish()
+                else:
+                    self._attach_latest()
+            except Exception as e:
+                logging.error(f"Shared catalog poll failed: {e}")
+            finally:
+                self._refresh_lock.release()
+
+    def get(self) -> CatalogSnapshot:
+        self._ensure_watcher()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        return snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        """Publish a fresh generation if this worker is the publisher; otherwise ask the
+        publisher for one and attach to the newest generation available."""
+        self._ensure_watcher()
+        with self._refresh_lock:
+            # A cold worker takes the published generation unless it is the publisher
+            # and that generation is due for replacement; a worker that already has a
+            # snapshot gets a newer one.
+            publisher = self._try_become_publisher()
+            published = read_generation(self.directory)
+            if self._snapshot is None and published and not (publisher and self._publish_due()):
+                return self._attach(published)
+            if publisher:
+                return self._publish()
+
+            with open(os.path.join(self.directory, REFRESH_REQUEST_FILE), 'a'):
+                os.utime(os.path.join(self.directory, REFRESH_REQUEST_FILE))
+            deadline = time.time() + self.wait_seconds
+            while True:
+                generation = read_generation(self.directory)
+                if generation > published:
+                    return self._attach(generation)
+                if time.time() > deadline:
+                    raise TimeoutError(f"No new shared catalog generation published in {self.directory} "
+                                       f"within {self.wait_seconds:g}s")
+                time.sleep(0.2)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update({
+            "shared_directory": self.directory,
+            "publisher": self.is_publisher,
+            "published_generation": read_generation(self.directory),
+        })
+        return stats
@@ -0,0 +1,73 @@
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .scoring import rank_scored
+
+
+def _as_list(value) -> List[str]:
+    return value if isinstance(value, list) else []
+
+
+def movie_terms(movie: Dict) -> List[str]:
+    """Feature terms for one movie: its genres, cast and (when present) directors."""
+    return (['genre:' + g for g in _as_list(movie.get('genres'))]
+            + ['cast:' + c for c in _as_list(movie.get('cast'))]
+            + ['director:' + d for d in _as_list(movie.get('directors'))])
+
+
+class TfidfIndex:
+    """Sparse, L2-normalized TF-IDF matrix over genre, cast and director terms.
+
+    Built once per catalog snapshot. A selection is scored with one sparse
+    matrix-vector product against the catalog, and only rows with a non-zero
+    similarity are ever materialized, so cost follows the number of matching
+    movies rather than the catalog or vocabulary size.
+    """
+
+    def __init__(self, movies: List[Dict], catalog_version: int):
+        self.catalog_version = catalog_version
+        self.vectorizer = TfidfVectorizer(analyzer=movie_terms, sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform(movies).tocsr()
+
+    def similarities(self, selected_movies: List[Dict]):
+        """Return (rows, similarity) for every catalog row matching the selection, rows ascending."""
+        selected = self.vectorizer.transform(selected_movies)
+        profile = normalize(sp.csr_matrix(np.ones((1, selected.shape[0]))) @ selected)
+        scores = (self.matrix @ profile.T).tocoo()
+        order = np.argsort(scores.row)
+        return scores.row[order].astype(np.int64), scores.data[order]
+
+
+def rank_movies_tfidf(snapshot, index: TfidfIndex, selected_movies: List[Dict], predict_masks: Callable,
+                      k: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """Rank catalog movies by predicted rating times TF-IDF similarity to the selection."""
+    rows, similarity = index.similarities(selected_movies)
+    keep = snapshot.genre_masks[rows] != 0
+    rows, similarity = rows[keep], similarity[keep]
+    if rows.size == 0:
+        return []
+
+    predicted = np.asarray(predict_masks(snapshot.genre_masks[rows]), dtype=np.float64).reshape(-1)
+    return rank_scored(snapshot.movies, rows, predicted, similarity, predicted * similarity, k=k, offset=offset)
+
+
+class TfidfIndexCache:
+    """Keeps the TF-IDF index for the current catalog snapshot, building it on first use."""
+
+    def __init__(self):
+        self._index: Optional[TfidfIndex] = None
+        self._lock = threading.Lock()
+
+    def get(self, snapshot) -> TfidfIndex:
+        index = self._index
+        if index is not None and index.catalog_version == snapshot.version:
+            return index
+        with self._lock:
+            if self._index is None or self._index.catalog_version != snapshot.version:
+                self._index = TfidfIndex(snapshot.movies, snapshot.version)
+            return self._index
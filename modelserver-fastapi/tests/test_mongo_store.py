@@ -0,0 +1,80 @@
+"""The direct MongoDB read path against an in-memory mongomock collection.
+
+Run from `modelserver-fastapi/`: python -m pytest tests
+"""
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from bson import ObjectId
+
+from adk import mongo_store
+
+
+@pytest.fixture
+def movies():
+    collection = mongomock.MongoClient().db.movies
+    collection.insert_many([
+        {"_id": ObjectId(), "title": "Alien", "genres": ["Horror", "SciFi"], "cast": ["Sigourney Weaver"],
+         "imdb": {"rating": 8.5, "votes": 700000}, "plot": "In space no one can hear you scream."},
+        {"_id": ObjectId(), "title": "Heat", "genres": ["Crime", "Drama"], "cast": ["Al Pacino"],
+         "imdb": {"rating": 8.3, "votes": 600000}, "plot": "A cop hunts a thief."},
+        {"_id": ObjectId(), "title": "Up", "genres": ["Animation"], "cast": ["Ed Asner"],
+         "imdb": {"rating": 8.2, "votes": 900000}, "plot": "A house flies away."},
+    ])
+    return collection
+
+
+def ids_by_title(collection):
+    return {doc["title"]: str(doc["_id"]) for doc in collection.find({}, {"title": 1})}
+
+
+def test_find_by_ids_uses_one_in_query_and_returns_express_shaped_documents(movies, monkeypatch):
+    ids = ids_by_title(movies)
+    queries = []
+    find = movies.find
+
+    def recording_find(query, *args, **kwargs):
+        queries.append(query)
+        return find(query, *args, **kwargs)
+
+    monkeypatch.setattr(movies, "find", recording_find)
+
+    found = mongo_store.find_movies_by_ids([ids["Alien"], ids["Up"]], collection=movies)
+
+    assert len(queries) == 1 and set(queries[0]["_id"]) == {"$in"}
+    assert sorted(doc["title"] for doc in found) == ["Alien", "Up"]
+    assert all(isinstance(doc["_id"], str) for doc in found)
+
+
+def test_find_by_ids_projects_only_the_movie_fields(movies):
+    ids = ids_by_title(movies)
+
+    [doc] = mongo_store.find_movies_by_ids([ids["Heat"]], collection=movies)
+
+    assert doc == {"_id": ids["Heat"], "title": "Heat", "genres": ["Crime", "Drama"], "cast": ["Al Pacino"],
+                   "imdb": {"rating": 8.3}}
+
+
+def test_find_by_ids_without_projection_returns_whole_documents(movies):
+    ids = ids_by_title(movies)
+
+    [doc] = mongo_store.find_movies_by_ids([ids["Up"]], projection=None, collection=movies)
+
+    assert doc["plot"] == "A house flies away." and doc["imdb"]["votes"] == 900000
+
+
+def test_find_by_ids_skips_missing_and_invalid_ids(movies):
+    ids = ids_by_title(movies)
+
+    found = mongo_store.find_movies_by_ids([ids["Alien"], str(ObjectId()), "not-an-object-id"], collection=movies)
+
+    assert [doc["title"] for doc in found] == ["Alien"]
+    assert mongo_store.find_movies_by_ids(["not-an-object-id"], collection=movies) == []
+
+
+def test_iter_movies_streams_projected_documents_with_a_limit(movies):
+    docs = list(mongo_store.iter_movies(limit=2, batch_size=1, collection=movies))
+
+    assert len(docs) == 2
+    assert all(set(doc) == {"_id", "title", "genres", "cast", "imdb"} for doc in docs)
+    assert all("votes" not in doc["imdb"] for doc in docs)
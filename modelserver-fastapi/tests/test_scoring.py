@@ -0,0 +1,76 @@
+"""`rank_movies` against the per-movie loop it replaced.
+
+Run from `modelserver-fastapi/`: python -m pytest tests
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import cosine
+
+from recommender.genres import GENRE_NAMES, build_genre_masks, genre_names_to_mask, unpack_genre_masks
+from recommender.scoring import rank_movies
+
+
+class FakeModel:
+    """Deterministic rating from the genre row; few distinct values, so ties are common."""
+
+    def predict(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return (rows @ (np.arange(rows.shape[1]) % 4) % 7 + 3.5).astype(np.float64)
+
+
+def per_movie_ranking(movies, selected_genres, model):
+    """The original loop: one predict and one scipy cosine per movie, then a stable sort."""
+    selected = np.array([1 if genre in selected_genres else 0 for genre in GENRE_NAMES], dtype=np.int64)
+    ranked = []
+    for movie in movies:
+        row = np.array([1 if genre in movie.get("genres", []) else 0 for genre in GENRE_NAMES],
+                       dtype=np.int64).reshape(1, -1)
+        if not np.any(row):
+            continue
+        predicted = model.predict(row)[0]
+        similarity = 1 - cosine(row.flatten(), selected) if np.any(selected) else 0.0
+        similarity = 0.0 if math.isnan(similarity) else similarity
+        ranked.append({
+            "title": movie.get("title", "Unknown"),
+            "genres": movie.get("genres", []),
+            "cast": movie.get("cast", []),
+            "predicted_rating": float(predicted),
+            "genre_similarity": float(similarity),
+            "combined_score": float(predicted * similarity),
+        })
+    ranked.sort(key=lambda m: m["combined_score"], reverse=True)
+    return ranked
+
+
+def catalog(size=400, seed=7):
+    rng = random.Random(seed)
+    movies = []
+    for i in range(size):
+        genres = rng.sample(GENRE_NAMES, rng.randint(0, 4)) + (["Unknown"] if i % 11 == 0 else [])
+        movies.append({"title": f"Movie {i}", "genres": genres, "cast": [f"Actor {i % 13}"]})
+    return movies
+
+
+@pytest.mark.parametrize("selected_genres", [
+    ["Drama"],
+    ["Action", "SciFi", "Thriller"],
+    ["Comedy", "Romance", "Family", "Animation", "Music"],
+    [],
+])
+def test_rank_movies_matches_per_movie_loop(selected_genres):
+    movies = catalog()
+    model = FakeModel()
+    expected = per_movie_ranking(movies, selected_genres, model)
+
+    ranked = rank_movies(movies, build_genre_masks(movies), genre_names_to_mask(selected_genres),
+                         lambda masks: model.predict(unpack_genre_masks(masks)))
+
+    assert [m["title"] for m in ranked] == [m["title"] for m in expected]
+    for got, want in zip(ranked, expected):
+        assert got["genres"] == want["genres"] and got["cast"] == want["cast"]
+        for field in ("predicted_rating", "genre_similarity", "combined_score"):
+            assert got[field] == pytest.approx(want[field], abs=1e-12)
+
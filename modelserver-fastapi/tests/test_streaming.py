@@ -0,0 +1,92 @@
+"""Streamed answers end to end with the LocalLLM stand-in.
+
+Run from `modelserver-fastapi/`: python -m pytest tests
+"""
+import asyncio
+import json
+import time
+
+from adk import generator
+from adk.streaming import sse_answer_events
+
+
+class FakeRequest:
+    """Reports a disconnect once `disconnect_after` polls have been answered."""
+
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+        self.polls = 0
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.disconnect_after is not None and self.polls > self.disconnect_after
+
+
+def collect(events):
+    async def drain():
+        return [event async for event in events]
+    parsed = []
+    for raw in asyncio.run(drain()):
+        name, data = raw.strip().split('\n')
+        parsed.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return parsed
+
+
+def local_tokens(monkeypatch, context):
+    monkeypatch.setattr(generator, 'LLM_BACKEND', 'local')
+    return generator.generate_response_stream(context, 'Which movie?')
+
+
+def test_sources_tokens_then_done(monkeypatch):
+    completed = []
+    events = collect(sse_answer_events(FakeRequest(), [{"id": "doc-1"}],
+                                       local_tokens(monkeypatch, "Alien is a 1979 film"),
+                                       on_complete=completed.append))
+
+    names = [name for name, _ in events]
+    assert names == ['sources', 'token', 'token', 'token', 'token', 'token', 'done']
+    assert events[0][1] == [{"id": "doc-1"}]
+    answer = ''.join(data for name, data in events if name == 'token')
+    assert answer == "Alien is a 1979 film"
+    assert events[-1][1]["response"] == answer
+    assert completed == [answer]
+
+
+def test_disconnect_stops_generation(monkeypatch):
+    tokens = local_tokens(monkeypatch, "one two three four five six")
+    completed = []
+    events = collect(sse_answer_events(FakeRequest(disconnect_after=2), [], tokens,
+                                       on_complete=completed.append))
+
+    assert [name for name, _ in events] == ['sources', 'token', 'token']
+    assert completed == []
+    # The generator was closed, so the upstream model stops producing tokens.
+    assert next(tokens, None) is None
+
+
+def test_generation_failure_is_an_error_event(monkeypatch):
+    monkeypatch.setattr(generator, 'LLM_BACKEND', 'gemini')
+    monkeypatch.setattr(generator, 'HAS_GOOGLE', False)
+    completed = []
+    events = collect(sse_answer_events(FakeRequest(), [], generator.generate_response_stream("ctx", "q"),
+                                       on_complete=completed.append))
+
+    assert [name for name, _ in events] == ['sources', 'error']
+    assert 'GOOGLE_API_KEY' in events[-1][1]["detail"]
+    assert completed == []
+
+
+def test_timeout_sends_partial_answer():
+    def slow_tokens():
+        yield "partial"
+        time.sleep(0.5)
+        yield " answer"
+
+    stages = [{"stage": "retrieval", "status": "ok", "ms": 1.0}]
+    events = collect(sse_answer_events(FakeRequest(), [], slow_tokens(), stages=stages, timeout=0.2))
+
+    name, done = events[-1]
+    assert name == 'done'
+    assert done["response"] == "partial"
+    assert done["partial"] is True
+    assert done["stages"][-1]["stage"] == 'generation' and done["stages"][-1]["status"] == 'timeout'